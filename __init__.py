@@ -50,48 +50,169 @@ from bpy.utils import (register_class,
                        unregister_class,
                        )
 from bpy.app.handlers import persistent
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from functools import wraps
 from uuid import uuid4
+import argparse
+import inspect
+import json
 import logging
-import queue
+import math
+import numpy as np
+import os
+import sys
+import time
 
 logging.basicConfig(level = logging.WARNING)
 light_types = ['AREA', 'POINT', 'SPOT', 'SUN']
-exec_queue = queue.SimpleQueue()
-tracked_scene = object()
+active = False
+exec_queue = {}
+exec_job = None
+exec_budget = 0.006
+job_chunk = 64
+exec_stats = {"queued": 0, "coalesced": 0, "executed": 0, "failed": 0,
+              "latency_total": 0.0, "latency_max": 0.0}
+tracked_scenes = {}
+handler_stats = {"processed": 0, "skipped": 0}
+handler_interval = 0.1
+handler_last = 0.0
+handler_missed = {}
+rendering = False
+desk_states = OrderedDict()
+desk_cache_size = 8
+desk_generation = 0
+instance_cache = {}
+draw_cache = {}
+msgbus_owner = object()
+state_version = 1
+transaction_depth = 0
+transaction_writes = []
+transaction_tags = []
+transaction_redraw = False
+panel_classes = {}
+profiling = False
+profile_stats = {}
+profile_buckets = (0.0001, 0.001, 0.01, 0.1)
+profile_samples = 1000
+
+# Profiling --------------------------------------------------------------------
+
+def profiled(function):
+    """Record call count and timings for function while profiling is enabled."""
+    name = function.__qualname__
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if not profiling:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record_timing(name, time.perf_counter() - start)
+    return wrapper
+
+def record_timing(name, elapsed):
+    stats = profile_stats.get(name)
+    if stats is None:
+        stats = profile_stats[name] = {"calls": 0, "total": 0.0, "max": 0.0,
+                                       "samples": deque(maxlen = profile_samples)}
+    stats["calls"] += 1
+    stats["total"] += elapsed
+    stats["max"] = max(stats["max"], elapsed)
+    stats["samples"].append(elapsed)
+
+def apply_profiling(self, context):
+    global profiling
+    logging.info("apply_profiling %s", self.profiling)
+    profiling = self.profiling
+    if profiling:
+        profile_stats.clear()
+
+def get_histogram(samples):
+    """Bucket recent samples by the upper bounds in profile_buckets."""
+    histogram = [0] * (len(profile_buckets) + 1)
+    for sample in samples:
+        bucket = 0
+        while bucket < len(profile_buckets) and sample >= profile_buckets[bucket]:
+            bucket += 1
+        histogram[bucket] += 1
+    return histogram
+
+def get_profile():
+    profile = {}
+    for name, stats in profile_stats.items():
+        profile[name] = {"calls": stats["calls"],
+                         "total": stats["total"],
+                         "mean": stats["total"] / stats["calls"],
+                         "max": stats["max"],
+                         "histogram": get_histogram(stats["samples"])}
+    return profile
+
+def profile_report():
+    labels = [f"<{bound * 1000:g}ms" for bound in profile_buckets]
+    labels.append(f">={profile_buckets[-1] * 1000:g}ms")
+    lines = [f"{'name':<40} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  {' '.join(labels)}"]
+    profile = get_profile()
+    for name in sorted(profile, key = lambda name: profile[name]["total"], reverse = True):
+        stats = profile[name]
+        histogram = " ".join(f"{count:>{len(label)}}" for count, label in zip(stats["histogram"], labels))
+        lines.append(f"{name:<40} {stats['calls']:>8} {stats['total'] * 1000:>10.2f} "
+                     f"{stats['mean'] * 1000:>9.3f} {stats['max'] * 1000:>9.3f}  {histogram}")
+    return lines
+
+def dump_profile(filepath):
+    logging.info("dump_profile %s", filepath)
+    data = {"version": bl_info["version"],
+            "blender": bpy.app.version_string,
+            "buckets": profile_buckets,
+            "queue": get_exec_stats(),
+            "profile": get_profile()}
+    with open(filepath, 'w') as file:
+        json.dump(data, file, indent = 2)
 
 # Core -------------------------------------------------------------------------
 
+def is_lazy():
+    """True if LIGHTDESK_LAZY is set, deferring the scan, panels and handlers to first use."""
+    return os.environ.get("LIGHTDESK_LAZY", "") not in ("", "0")
+
 def activate():
+    global active
     logging.info("activate")
+    active = True
     try:
-        append_exec_queue(update_lights)
-        append_exec_queue(update_filtered)
+        append_exec_queue(scan_lights)
         append_exec_queue(track_scene)
-        append_exec_queue(deadhead_panels)
         append_exec_queue(deadhead_channels)
-        append_exec_queue(rebuild_ui)
-        add_timer(exec_queued)
+        append_exec_queue(rebuild_panels)
         add_handlers()
+        subscribe_scene_switch()
     except Exception as e:
         logging.critical(e)
         deactivate()
 
 def deactivate():
+    global active
     logging.info("deactivate")
+    active = False
     try:
         purge_panels()
         remove_timer(exec_queued)
+        remove_timer(catch_up)
+        handler_missed.clear()
+        instance_cache.clear()
+        cancel_job()
+        exec_queue.clear()
         remove_handlers()
+        bpy.msgbus.clear_by_owner(msgbus_owner)
     except Exception as e:
         logging.critical(e)
 
-def add_timer(function):
-    logging.info(f"add_timer {function}")
-    if not bpy.app.timers.is_registered(function):
-        bpy.app.timers.register(function)
-
 def remove_timer(function):
-    logging.info(f"remove_timer {function}")
+    logging.info("remove_timer %s", function)
     if bpy.app.timers.is_registered(function):
         bpy.app.timers.unregister(function)
 
@@ -106,6 +227,21 @@ def add_handlers():
     if depsgraph_update_post not in bpy.app.handlers.depsgraph_update_post:
         logging.info("- depsgraph_update_post")
         bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post)
+    if undo_post not in bpy.app.handlers.undo_post:
+        logging.info("- undo_post")
+        bpy.app.handlers.undo_post.append(undo_post)
+    if undo_post not in bpy.app.handlers.redo_post:
+        logging.info("- redo_post")
+        bpy.app.handlers.redo_post.append(undo_post)
+    if render_init not in bpy.app.handlers.render_init:
+        logging.info("- render_init")
+        bpy.app.handlers.render_init.append(render_init)
+    if render_done not in bpy.app.handlers.render_complete:
+        logging.info("- render_complete")
+        bpy.app.handlers.render_complete.append(render_done)
+    if render_done not in bpy.app.handlers.render_cancel:
+        logging.info("- render_cancel")
+        bpy.app.handlers.render_cancel.append(render_done)
 
 def remove_handlers():
     logging.info("remove_handlers")
@@ -118,314 +254,1971 @@ def remove_handlers():
     if depsgraph_update_post in bpy.app.handlers.depsgraph_update_post:
         logging.info("- depsgraph_update_post")
         bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post)
+    if undo_post in bpy.app.handlers.undo_post:
+        logging.info("- undo_post")
+        bpy.app.handlers.undo_post.remove(undo_post)
+    if undo_post in bpy.app.handlers.redo_post:
+        logging.info("- redo_post")
+        bpy.app.handlers.redo_post.remove(undo_post)
+    if render_init in bpy.app.handlers.render_init:
+        logging.info("- render_init")
+        bpy.app.handlers.render_init.remove(render_init)
+    if render_done in bpy.app.handlers.render_complete:
+        logging.info("- render_complete")
+        bpy.app.handlers.render_complete.remove(render_done)
+    if render_done in bpy.app.handlers.render_cancel:
+        logging.info("- render_cancel")
+        bpy.app.handlers.render_cancel.remove(render_done)
+
+def subscribe_scene_switch():
+    """Catch scene switches from the window's scene selector. Redone in load_post, as loading drops subscriptions."""
+    logging.info("subscribe_scene_switch")
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    bpy.msgbus.subscribe_rna(key = (bpy.types.Window, "scene"),
+                             owner = msgbus_owner,
+                             args = (),
+                             notify = on_scene_switch)
+
+def on_scene_switch():
+    append_exec_queue(rebuild_ui_on_scene_change)
 
 @persistent
 def load_pre(scene):
-    logging.info(f"load_pre {scene.name}")
+    logging.info("load_pre %s", scene.name)
+    cancel_job()
     purge_panels()
+    desk_states.clear()
+    tracked_scenes.clear()
+    instance_cache.clear()
 
 @persistent
 def load_post(scene):
-    logging.info(f"load_post {scene.name}")
+    logging.info("load_post %s", scene.name)
+    desk_states.clear()
+    tracked_scenes.clear()
+    bpy.context.window_manager.lightdesk.panels.clear()
+    drop_legacy_index()
+    index_channels()
     track_scene()
-    rebuild_panels()
+    append_exec_queue(scan_lights)
+    append_exec_queue(reconcile_windows)
+    subscribe_scene_switch()
 
 @persistent
-def depsgraph_update_post(scene):
-    logging.info(f"depsgraph_update_post {scene.name}")
-    refresh_lights_on_update()
+def undo_post(scene):
+    logging.info("undo_post %s", scene.name)
+    cancel_job()
+    instance_cache.clear()
+    for state in desk_states.values():
+        state.clear()
+    index_channels()
+    sync_panels()
+    append_exec_queue(scan_lights)
+
+@persistent
+@profiled
+def depsgraph_update_post(scene, depsgraph = None):
+    global handler_last
+    if transaction_depth:
+        return
+    reason = get_throttle(depsgraph)
+    if reason:
+        handler_stats["skipped"] += 1
+        defer_update(reason)
+        return
+    handler_stats["processed"] += 1
+    handler_last = time.perf_counter()
+    logging.info("depsgraph_update_post %s", scene.name)
+    refresh_lights_on_update(depsgraph)
     rebuild_ui_on_scene_change()
 
+@persistent
+def render_init(scene):
+    global rendering
+    logging.info("render_init %s", scene.name)
+    rendering = True
+
+@persistent
+def render_done(scene):
+    global rendering
+    logging.info("render_done %s", scene.name)
+    rendering = False
+
+# Throttling -------------------------------------------------------------------
+
+def is_playing():
+    return any(window.screen.is_animation_playing for window in bpy.context.window_manager.windows)
+
+def is_transform_only(depsgraph):
+    """True if depsgraph only moved existing objects, as while dragging with a gizmo."""
+    updates = depsgraph.updates
+    return (any(update.is_updated_transform for update in updates)
+            and not any(update.is_updated_geometry or update.is_updated_shading for update in updates)
+            and not has_objects_changed())
+
+def get_throttle(depsgraph):
+    """Return why a handler call can be skipped: 'ALL' during playback or a render, 'MOVE' for a quick drag, else None."""
+    if not bpy.context.window_manager.lightdesk.throttle:
+        return None
+    if rendering or is_playing():
+        return 'ALL'
+    if (depsgraph is not None and time.perf_counter() - handler_last < handler_interval
+            and is_transform_only(depsgraph)):
+        return 'MOVE'
+    return None
+
+def defer_update(reason):
+    handler_missed[reason] = time.perf_counter()
+    if not bpy.app.timers.is_registered(catch_up):
+        bpy.app.timers.register(catch_up, first_interval = handler_interval)
+
+def catch_up():
+    """Timer: once playback, rendering and dragging have settled, make up for skipped handler calls."""
+    if not handler_missed:
+        return None
+    if rendering or is_playing() or time.perf_counter() - max(handler_missed.values()) < handler_interval:
+        return handler_interval
+    logging.info("catch_up %s", list(handler_missed))
+    missed = set(handler_missed)
+    handler_missed.clear()
+    if 'ALL' in missed:
+        append_exec_queue(settle_lights)
+        append_exec_queue(rebuild_ui_on_scene_change)
+    else:
+        get_desk_state().contribution = None
+    redraw_ui()
+    return None
+
+def drop_legacy_index():
+    """Remove the light index older versions saved on each scene."""
+    for scene in bpy.data.scenes:
+        for key in ("lights", "filtered", "objects"):
+            if key in scene.lightdesk:
+                del scene.lightdesk[key]
+
 def append_exec_queue(function):
-    logging.info(f"append_exec_queue {function}")
-    exec_queue.put(function)
+    """Queue function for the next timer tick, moving it to the back if it is already waiting."""
+    logging.info("append_exec_queue %s", function)
+    queued = exec_queue.pop(function, None)
+    if queued is None:
+        queued = time.perf_counter()
+        exec_stats["queued"] += 1
+    else:
+        exec_stats["coalesced"] += 1
+    exec_queue[function] = queued
+    if not bpy.app.timers.is_registered(exec_queued):
+        bpy.app.timers.register(exec_queued, first_interval = 0, persistent = True)
 
 def exec_queued():
-    while not exec_queue.empty():
-        function = exec_queue.get()
-        logging.info(f"exec_queued {function}")
-        function()
-    return 1.0
+    """Run queued work, stepping generator jobs, for up to exec_budget seconds per tick."""
+    global exec_job
+    deadline = time.perf_counter() + exec_budget
+    while exec_job or exec_queue:
+        if exec_job is None:
+            function = next(iter(exec_queue))
+            queued = exec_queue.pop(function)
+            latency = time.perf_counter() - queued
+            exec_stats["latency_total"] += latency
+            exec_stats["latency_max"] = max(exec_stats["latency_max"], latency)
+            logging.info("exec_queued %s", function)
+            start = time.perf_counter()
+            try:
+                result = function()
+            except Exception as e:
+                exec_stats["failed"] += 1
+                logging.error(e)
+                result = None
+            if inspect.isgenerator(result):
+                exec_job = [function, result, 0.0]
+            else:
+                exec_stats["executed"] += 1
+                if profiling:
+                    record_timing(f"exec_queued:{function.__qualname__}", time.perf_counter() - start)
+        if exec_job:
+            step_job(deadline)
+        if time.perf_counter() >= deadline and (exec_job or exec_queue):
+            redraw_ui()
+            return 0.0
+    return None
+
+def step_job(deadline):
+    """Advance the running job until it finishes or the deadline passes."""
+    global exec_job
+    function, job = exec_job[0], exec_job[1]
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() < deadline:
+            exec_job[2] = next(job)
+    except StopIteration:
+        exec_job = None
+        exec_stats["executed"] += 1
+        redraw_ui()
+    except Exception as e:
+        exec_job = None
+        exec_stats["failed"] += 1
+        logging.error(e)
+    if profiling:
+        record_timing(f"exec_queued:{function.__qualname__}", time.perf_counter() - start)
+
+def cancel_job(function = None):
+    """Stop the running job, or only if it was queued as function."""
+    global exec_job
+    if exec_job and function in (None, exec_job[0]):
+        logging.info("cancel_job %s", exec_job[0])
+        exec_job[1].close()
+        exec_job = None
+
+def get_job_progress():
+    """Return the running job's name and progress, or None."""
+    if exec_job:
+        return exec_job[0].__name__, exec_job[2]
+    return None
+
+def run_job(job):
+    """Run a job to completion right away."""
+    for progress in job:
+        pass
+
+def get_exec_stats():
+    stats = dict(exec_stats)
+    stats["depth"] = len(exec_queue)
+    stats["latency_mean"] = stats["latency_total"] / max(stats["executed"], 1)
+    return stats
 
 def debug_data():
-    global tracked_scene
     logging.info("----------------------------------------")
-    logging.info(f"Current scene: {tracked_scene.name}")
+    logging.info("Current scene: %s", bpy.context.scene.name)
+    logging.info("Tracked windows: %s", len(tracked_scenes))
+    logging.info("Queue: %s", get_exec_stats())
+    logging.info("Handler: %s", handler_stats)
+    for line in profile_report():
+        logging.info(line)
     ui_props = bpy.context.window_manager.lightdesk
-    logging.info(f"{len(ui_props.panels)} panels:")
+    logging.info("%s panels:", len(ui_props.panels))
     if len(ui_props.panels):
         for panel in ui_props.panels:
-            logging.info(f"- {panel.name}")
+            logging.info("- %s", panel.name)
     for scene in bpy.data.scenes:
         scene_props = scene.lightdesk
-        logging.info(f"..... {scene.name} .....")
-        logging.info(f"Lights: {scene_props.lights.keys()}")
-        logging.info(f"Filtered: {scene_props.filtered.keys()}, {scene_props.selected}")
-        logging.info(f"{len(scene_props.channels)} channels:")
+        state = desk_states.get(scene.as_pointer())
+        logging.info("..... %s .....", scene.name)
+        if state and state.lights is not None:
+            logging.info("Lights: %s", list(state.lights))
+            logging.info("Filtered: %s, %s", list(state.filtered), scene_props.selected)
+        logging.info("%s channels:", len(scene_props.channels))
         if len(scene_props.channels):
             for channel in scene_props.channels:
-                logging.info(f"- {channel.name}, {channel.object.name}")
+                logging.info("- %s, %s", channel.name, get_channel_label(channel))
     logging.info("----------------------------------------")
 
+# State ------------------------------------------------------------------------
+
+class DeskState:
+    """Runtime bookkeeping for one scene. Never saved, rebuilt on demand."""
+
+    def __init__(self):
+        self.panels = None
+        self.selected_name = None
+        self.clear()
+
+    def clear(self):
+        self.lights = None
+        self.instancers = None
+        self.filtered = None
+        self.object_count = -1
+        self.light_info = None
+        self.light_users = None
+        self.buckets = None
+        self.channel_objects = None
+        self.channel_indices = None
+        self.groups = {}
+        self.search_keys = None
+        self.search_sorted = None
+        self.list_filter = None
+        self.contribution = None
+
+def bump_generation():
+    """Mark cached references into channels as stale after any desk mutation."""
+    global desk_generation
+    desk_generation += 1
+
+def get_desk_state(scene = None):
+    """Return the state for scene, creating it if there is none yet."""
+    scene = scene or bpy.context.scene
+    key = scene.as_pointer()
+    state = desk_states.get(key)
+    if state is None:
+        state = desk_states[key] = DeskState()
+    else:
+        desk_states.move_to_end(key)
+    return state
+
+def trim_desk_states():
+    """Evict the least recently used states beyond desk_cache_size, except those of scenes shown in a window."""
+    shown = {scene.as_pointer() for scene in get_window_scenes().values()}
+    stale = [key for key in desk_states if key not in shown]
+    for key in stale[:max(len(desk_states) - desk_cache_size, 0)]:
+        evict_desk_state(key, desk_states.pop(key))
+
+def evict_desk_state(key, state):
+    logging.info("evict_desk_state %s", key)
+    if state.panels:
+        owned = set()
+        for other in desk_states.values():
+            owned |= other.panels or set()
+        remove_panels(state.panels - owned, state)
+
 # Tracking ---------------------------------------------------------------------
 
+def get_window_scenes():
+    """Return {window pointer: scene} for every open window."""
+    return {window.as_pointer(): window.scene for window in bpy.context.window_manager.windows}
+
 def track_scene():
-    global tracked_scene
-    tracked_scene = bpy.context.scene
-    logging.info(f"track_scene {tracked_scene.name}")
+    """Remember which scene each window shows, so windows on different scenes don't look like switches."""
+    global tracked_scenes
+    tracked_scenes = get_window_scenes()
+    bump_generation()
+    logging.info("track_scene %s", [scene.name for scene in tracked_scenes.values()])
 
 def has_scene_changed():
-    global tracked_scene
     changed = False
     try:
-        changed = tracked_scene != bpy.context.scene
-    except InvalidReference:
+        changed = tracked_scenes != get_window_scenes()
+    except ReferenceError:
         changed = True
     return changed
 
 def has_objects_changed():
-    return len(bpy.context.scene.objects) != bpy.context.scene.lightdesk.objects
+    return len(bpy.context.scene.objects) != get_desk_state().object_count
 
 # Lights -----------------------------------------------------------------------
 
-def is_object_light():
-    is_light = False
-    if bpy.context.object:
-        is_light = bpy.context.object.type == 'LIGHT'
-    return is_light
-
-def refresh_lights_on_update():
-    if is_object_light() or has_objects_changed():
-        refresh_lights()
-        add_timer(deadhead_channels)
-        bpy.context.scene.lightdesk.objects = len(bpy.context.scene.objects)
+def refresh_lights_on_update(depsgraph = None):
+    if is_indexing():
+        # The running job picks up the scene as it stands; reconciled once it ends.
+        return
+    scene = bpy.context.scene
+    if depsgraph is not None and depsgraph.scene == scene:
+        if sync_lights(depsgraph):
+            bump_generation()
+            append_exec_queue(deadhead_channels)
+    elif has_objects_changed():
+        append_exec_queue(scan_lights)
+        append_exec_queue(deadhead_channels)
+    if has_objects_changed():
+        get_desk_state().object_count = len(scene.objects)
+        restore_selection()
+
+@profiled
+def sync_lights(depsgraph):
+    """Apply the light changes in depsgraph.updates to the index. Returns True if a light may have been removed."""
+    scene = bpy.context.scene
+    state = get_light_state()
+    if state.object_count < 0:
+        append_exec_queue(scan_lights)
+        return True
+    updated = {}
+    retyped = set()
+    light_data = set()
+    instancers = {}
+    collections = []
+    objects_updated = False
+    for update in depsgraph.updates:
+        id = update.id.original
+        if isinstance(id, bpy.types.Object):
+            objects_updated = True
+            if id == scene.camera:
+                get_desk_state().contribution = None
+            if id.type == 'LIGHT':
+                updated[id.name] = id
+                if update.is_updated_geometry:
+                    retyped.add(id.name)
+            elif scene.lightdesk.list_instances and (is_instancer(id) or id.name in state.instancers):
+                instancers[id.name] = id
+        elif isinstance(id, bpy.types.Light):
+            light_data.add(id)
+        elif isinstance(id, bpy.types.Collection):
+            collections.append(id)
+    count = len(scene.objects) - state.object_count
+    removed = []
+    if count:
+        object_names = set(scene.objects.keys())
+        removed = [name for name, light in state.lights.items() if not is_light_valid(name, light, object_names)]
+        removed += [name for name, instancer in state.instancers.items()
+                    if not is_light_valid(name, instancer, object_names)]
+    added = [light for name, light in updated.items() if name not in state.lights]
+    if added and count <= 0:
+        renamed = rename_lights(added, state)
+        added = [light for light in added if light.name not in renamed]
+    if (count > 0 and not objects_updated) or len(added) > max(count, 0) + len(removed):
+        logging.info("sync_lights: ambiguous update, rescanning")
+        append_exec_queue(scan_lights)
+        return True
+    for light_name in removed:
+        remove_light(light_name)
+    for light in added:
+        add_light(light)
+    for light_name in get_light_users(light_data) | retyped:
+        light = state.lights.get(light_name)
+        if light:
+            retype_light(light)
+    if collections and invalidate_instances(collections):
+        instancers.update(state.instancers)
+    for instancer in instancers.values():
+        track_instancer(instancer, state)
+    if light_data and state.instancers:
+        filter_instancers(state)
+    reindex_search(updated.values())
+    if updated or light_data:
+        get_desk_state().contribution = None
+    return bool(removed)
+
+def rename_lights(lights, state):
+    """Re-key indexed lights that are among lights under a new name. Returns the new names."""
+    pointers = {light.as_pointer() for light in lights}
+    renamed = set()
+    for light_name, light in list(state.lights.items()):
+        try:
+            if light.name != light_name and light.as_pointer() in pointers:
+                rename_light(light_name, light, state)
+                renamed.add(light.name)
+        except ReferenceError:
+            pass
+    return renamed
+
+def rename_light(light_name, light, state):
+    logging.info("rename_light %s %s", light_name, light.name)
+    listed = light_name in state.filtered
+    untrack_light(light_name, state)
+    track_light(light, state)
+    if listed:
+        collect_light(light, state)
+    if state.selected_name == light_name:
+        state.selected_name = light.name
+
+def is_light_valid(light_name, light, object_names):
+    """True if the indexed object still exists under the name it was indexed with."""
+    try:
+        return light.name == light_name and light_name in object_names
+    except ReferenceError:
+        return False
 
-def does_light_exist(light_name):
-    return bpy.context.scene.objects.find(light_name) >= 0
+def is_type_listed(light_type):
+    lightdesk = bpy.context.scene.lightdesk
+    if light_type == 'AREA':
+        return lightdesk.list_area
+    elif light_type == 'POINT':
+        return lightdesk.list_point
+    elif light_type == 'SPOT':
+        return lightdesk.list_spot
+    elif light_type == 'SUN':
+        return lightdesk.list_sun
+    return False
+
+def is_light_listed(light):
+    return is_type_listed(light.data.type)
+
+def get_light_state():
+    """Return the desk state's light index, queuing a scan that fills it in if there is none yet."""
+    state = get_desk_state()
+    if state.light_info is None:
+        reset_light_index(state)
+        append_exec_queue(scan_lights)
+    return state
+
+def peek_light_state(scene = None):
+    """Return the desk state for drawing and polls, or an empty one if its index isn't built, queuing nothing."""
+    state = desk_states.get((scene or bpy.context.scene).as_pointer())
+    if state is None or state.light_info is None:
+        state = DeskState()
+        reset_light_index(state)
+    return state
+
+def reset_light_index(state):
+    state.lights = {}
+    state.instancers = {}
+    state.filtered = {}
+    state.light_info = {}
+    state.light_users = {}
+    state.buckets = {light_type: {} for light_type in light_types}
+    state.search_keys = {}
+    state.search_sorted = None
+    state.contribution = None
+    state.object_count = -1
+
+def get_light_users(light_data):
+    """Return the names of indexed lights using any of the given light data."""
+    state = get_light_state()
+    names = set()
+    for data in light_data:
+        names |= state.light_users.get(data.as_pointer(), set())
+    return names
+
+def track_light(light, state = None):
+    state = state or get_light_state()
+    light_type = light.data.type
+    state.lights[light.name] = light
+    state.light_info[light.name] = (light_type, light.data.as_pointer())
+    state.light_users.setdefault(light.data.as_pointer(), set()).add(light.name)
+    state.buckets.setdefault(light_type, {})[light.name] = None
+    state.search_keys[light.name] = get_search_key(light)
+    if state.search_sorted is not None:
+        insort(state.search_sorted, (light.name.lower(), light.name))
+
+def untrack_light(light_name, state = None):
+    state = state or get_light_state()
+    state.lights.pop(light_name, None)
+    state.instancers.pop(light_name, None)
+    state.filtered.pop(light_name, None)
+    info = state.light_info.pop(light_name, None)
+    if state.search_keys.pop(light_name, None) is not None and state.search_sorted is not None:
+        entry = (light_name.lower(), light_name)
+        index = bisect_left(state.search_sorted, entry)
+        if index < len(state.search_sorted) and state.search_sorted[index] == entry:
+            del state.search_sorted[index]
+    if info:
+        light_type, data_pointer = info
+        state.buckets[light_type].pop(light_name, None)
+        users = state.light_users.get(data_pointer)
+        if users:
+            users.discard(light_name)
+
+def add_light(light):
+    logging.info("add_light %s", light.name)
+    track_light(light)
+    if is_light_listed(light):
+        collect_light(light)
+
+def remove_light(light_name):
+    logging.info("remove_light %s", light_name)
+    unfilter_lights({light_name})
+    untrack_light(light_name)
+
+def retype_light(light):
+    """Move light to the bucket for its current type if that has changed."""
+    state = get_light_state()
+    if state.light_info.get(light.name) == (light.data.type, light.data.as_pointer()):
+        return
+    logging.info("retype_light %s %s", light.name, light.data.type)
+    state.groups.clear()
+    listed = light.name in state.filtered
+    untrack_light(light.name, state)
+    track_light(light, state)
+    if is_light_listed(light):
+        collect_light(light, state)
+    elif listed:
+        unfilter_lights({light.name})
+
+def unfilter_lights(light_names):
+    """Remove the named lights from filtered, dropping the selection if it was one of them."""
+    bump_generation()
+    state = get_light_state()
+    for light_name in light_names:
+        state.filtered.pop(light_name, None)
+    if state.selected_name in light_names:
+        state.selected_name = None
+        bpy.context.scene.lightdesk.selected = -1
+
+def filter_bucket(light_type):
+    """Add or remove the lights of one type from filtered after a filter toggle."""
+    logging.info("filter_bucket %s", light_type)
+    state = get_light_state()
+    bucket = state.buckets.get(light_type, {})
+    if bucket:
+        if is_type_listed(light_type):
+            bump_generation()
+            state.filtered.update(dict.fromkeys(bucket))
+        else:
+            unfilter_lights(bucket)
+    filter_instancers(state)
+
+def scan_lights():
+    """Job: rebuild the scene's light index, listing lights as they are found and yielding progress."""
+    logging.info("scan_lights")
+    scene = bpy.context.scene
+    bump_generation()
+    state = get_desk_state(scene)
+    reset_light_index(state)
+    listed = {light_type for light_type in light_types if is_type_listed(light_type)}
+    instances = scene.lightdesk.list_instances
+    objects = scene.objects[:]
+    for index, object in enumerate(objects):
+        try:
+            if object.type == 'LIGHT':
+                track_light(object, state)
+                if object.data.type in listed:
+                    state.filtered[object.name] = None
+            elif instances and is_instancer(object):
+                track_instancer(object, state)
+        except ReferenceError:
+            pass
+        if index % job_chunk == job_chunk - 1:
+            bump_generation()
+            yield (index + 1) / len(objects)
+    sort_search_keys(state)
+    state.object_count = len(objects)
+    requeue_changed_scan(scene, state)
+    restore_selection()
+    bump_generation()
+
+def settle_lights():
+    """Job: recheck the light index after skipped handler calls, rescanning if objects were added, removed or renamed."""
+    logging.info("settle_lights")
+    state = get_light_state()
+    state.contribution = None
+    stale = has_objects_changed()
+    if not stale:
+        object_names = set(bpy.context.scene.objects.keys())
+        lights = list(state.lights.items())
+        for start in range(0, len(lights), job_chunk):
+            chunk = lights[start:start + job_chunk]
+            if not all(is_light_valid(name, light, object_names) for name, light in chunk):
+                stale = True
+                break
+            for name, light in chunk:
+                retype_light(light)
+            reindex_search([light for name, light in chunk])
+            yield (start + len(chunk)) / len(lights)
+    if not stale and state.instancers:
+        instancers = list(state.instancers.items())
+        stale = not all(is_light_valid(name, instancer, object_names) for name, instancer in instancers)
+        if not stale:
+            instance_cache.clear()
+            for name, instancer in instancers:
+                track_instancer(instancer, state)
+    if stale:
+        yield from scan_lights()
+        restore_selection()
+        append_exec_queue(deadhead_channels)
+    else:
+        requeue_changed_scan(bpy.context.scene, state)
+    bump_generation()
+
+def requeue_changed_scan(scene, state):
+    """Scan again if objects were added or removed while the handler skipped updates for a running scan."""
+    if len(scene.objects) != state.object_count:
+        logging.info("requeue_changed_scan %s", scene.name)
+        append_exec_queue(scan_lights)
+        append_exec_queue(deadhead_channels)
 
-def get_light_index(light_name):
-    return bpy.context.scene.lightdesk.filtered.find(light_name)
+def is_indexing():
+    """True while a scan is queued or part way through."""
+    return scan_lights in exec_queue or (bool(exec_job) and exec_job[0] in (scan_lights, settle_lights))
 
+@profiled
 def update_lights():
     logging.info("update_lights")
-    lightdesk = bpy.context.scene.lightdesk
-    lightdesk.lights.clear()
-    lights = [object for object in bpy.context.scene.objects if object.type == 'LIGHT']
-    for light in lights:
-        collect_light(light, lightdesk.lights)
+    cancel_job(scan_lights)
+    exec_queue.pop(scan_lights, None)
+    run_job(scan_lights())
 
+@profiled
 def update_filtered():
     logging.info("update_filtered")
-    lightdesk = bpy.context.scene.lightdesk
-    lightdesk.filtered.clear()
-    for light in lightdesk.lights:
-        if light.object.data.type == 'AREA':
-            if lightdesk.list_area:
-                collect_light(light.object, lightdesk.filtered)
-        elif light.object.data.type == 'POINT':
-            if lightdesk.list_point:
-                collect_light(light.object, lightdesk.filtered)
-        elif light.object.data.type == 'SPOT':
-            if lightdesk.list_spot:
-                collect_light(light.object, lightdesk.filtered)
-        elif light.object.data.type == 'SUN':
-            if lightdesk.list_sun:
-                collect_light(light.object, lightdesk.filtered)
+    bump_generation()
+    state = get_light_state()
+    listed = {light_type for light_type in state.buckets if is_type_listed(light_type)}
+    state.filtered = {name: None for name, info in state.light_info.items() if info[0] in listed}
+    filter_instancers(state)
 
 def update_listbox():
-    lightdesk = bpy.context.scene.lightdesk
-    if lightdesk.selected >= 0:
-        if lightdesk.selected < len(lightdesk.filtered):
-            current_selection = lightdesk.filtered[lightdesk.selected].name
-        else:
-            lightdesk.selected = -1
     update_filtered()
-    if lightdesk.selected >= 0:
-        lightdesk.selected = get_light_index(current_selection)
+    restore_selection()
+
+def select_light(self, context):
+    # The list was last drawn from these names, so don't walk scene.objects for the index.
+    state = get_desk_state()
+    cached = state.list_filter
+    if cached and cached["generation"] == desk_generation:
+        names = cached["names"]
+    else:
+        names = context.scene.objects.keys()
+    state.selected_name = names[self.selected] if 0 <= self.selected < len(names) else None
+
+def restore_selection():
+    """Point the list selection back at the selected light after objects were added or removed."""
+    lightdesk = bpy.context.scene.lightdesk
+    state = get_light_state()
+    if state.selected_name is None:
+        return
+    index = -1
+    if state.selected_name in state.filtered:
+        index = bpy.context.scene.objects.find(state.selected_name)
+    if index != lightdesk.selected:
+        # The name is already right; don't let select_light map the new index back through a stale list.
+        lightdesk["selected"] = index
 
 def refresh_lights():
     update_lights()
     update_listbox()
 
-def apply_filters(self, context):
-    logging.info("apply_filters")
-    update_listbox()
-
-def collect_light(object, collection):
-    logging.info(f"collect_light {object.name} {collection}")
-    light = collection.add()
-    light.name = object.name
-    light.object = object
-
-def get_selected_light():
-    logging.info("get_scelected_light")
-    lightdesk = bpy.context.scene.lightdesk
-    return lightdesk.filtered[lightdesk.selected].object
+def apply_filter(light_type):
+    def update(self, context):
+        logging.info("apply_filter %s", light_type)
+        filter_bucket(light_type)
+    return update
+
+def collect_light(light, state = None):
+    logging.info("collect_light %s", light.name)
+    bump_generation()
+    state = state or get_light_state()
+    state.filtered[light.name] = None
+
+def get_filtered_lights():
+    """Return the light objects currently shown in the list, with the source lights of listed instances."""
+    state = get_light_state()
+    lights = {}
+    for name in state.filtered:
+        if name in state.instancers:
+            for light in get_instance_lights(state.instancers[name]):
+                lights.setdefault(light.as_pointer(), light)
+        else:
+            light = state.lights[name]
+            lights.setdefault(light.as_pointer(), light)
+    return list(lights.values())
+
+def get_selected_objects(context):
+    """Return the lights selected in the viewport."""
+    return [object for object in context.selected_objects if object.type == 'LIGHT']
+
+def get_selected_lights():
+    """Return the light selected in the list, or the source lights of a selected collection instance."""
+    logging.info("get_selected_lights")
+    state = peek_light_state()
+    name = state.selected_name
+    if name in state.instancers:
+        return get_instance_lights(state.instancers[name])
+    if name in state.filtered and name in state.lights:
+        return [state.lights[name]]
+    return []
 
 def assign_light(light):
-    logging.info(f"assign_light {light.name}")
+    logging.info("assign_light %s", light.name)
     if not get_channel(light):
         create_channel(light)
 
+def assign_lights(lights):
+    """Create channels for all unassigned lights in one batch. Returns the count and the time taken."""
+    logging.info("assign_lights")
+    start = time.perf_counter()
+    pending = {}
+    for light in lights:
+        if light and light.as_pointer() not in pending and not get_channel(light):
+            pending[light.as_pointer()] = light
+    channel_names = []
+    for light in pending.values():
+        channel_name = get_channel_name()
+        add_channel(channel_name, light)
+        channel_names.append(channel_name)
+    if not is_list_view():
+        add_panels(channel_names, pending.values())
+    if channel_names:
+        redraw_ui()
+    return len(channel_names), time.perf_counter() - start
+
 def add_selected_light():
     logging.info("add_selected_light")
-    light = get_selected_light()
-    assign_light(light)
+    for light in get_selected_lights():
+        assign_light(light)
 
 def fill_lights():
     logging.info("fill_lights")
-    for light in bpy.context.scene.lightdesk.filtered:
-        assign_light(light.object)
+    return assign_lights(get_filtered_lights())
+
+# Instances --------------------------------------------------------------------
+
+def is_instancer(object):
+    return object.instance_type == 'COLLECTION' and object.instance_collection is not None
+
+def walk_collection(collection):
+    yield collection
+    for child in collection.children:
+        yield from walk_collection(child)
+
+def get_instanced_lights(collection, visiting = frozenset()):
+    """Return the source lights an instance of collection brings in, cached until one of its collections updates."""
+    key = collection.as_pointer()
+    entry = instance_cache.get(key)
+    if entry is None:
+        visiting = visiting | {key}
+        lights = {}
+        depends = set()
+        for child in walk_collection(collection):
+            depends.add(child.as_pointer())
+            for object in child.objects:
+                if object.type == 'LIGHT':
+                    lights.setdefault(object.as_pointer(), object)
+                elif is_instancer(object) and object.instance_collection.as_pointer() not in visiting:
+                    for light in get_instanced_lights(object.instance_collection, visiting):
+                        lights.setdefault(light.as_pointer(), light)
+                    depends |= instance_cache[object.instance_collection.as_pointer()][1]
+        entry = instance_cache[key] = [list(lights.values()), depends, None]
+    return entry[0]
+
+def get_instanced_words(collection):
+    """Return the search text for the lights of a collection instance, cached with them."""
+    lights = get_instanced_lights(collection)
+    entry = instance_cache[collection.as_pointer()]
+    if entry[2] is None:
+        words = [light.name for light in lights] + sorted({light.data.type for light in lights})
+        entry[2] = "\t".join(words)
+    return entry[2]
+
+def invalidate_instances(collections):
+    """Drop cached instance lights gathered from any of collections. Returns True if any were."""
+    keys = {collection.as_pointer() for collection in collections}
+    stale = [key for key, entry in instance_cache.items() if entry[1] & keys]
+    for key in stale:
+        del instance_cache[key]
+    return bool(stale)
+
+def get_instance_lights(instancer):
+    """Return the source lights of a collection instance whose type is listed."""
+    if not is_instancer(instancer):
+        return []
+    return [light for light in get_instanced_lights(instancer.instance_collection)
+            if is_type_listed(light.data.type)]
+
+def is_instance_listed(instancer, listed):
+    """True if a collection instance brings in a light of one of the listed types."""
+    return is_instancer(instancer) and any(light.data.type in listed
+                                           for light in get_instanced_lights(instancer.instance_collection))
+
+def get_listed_types():
+    return {light_type for light_type in light_types if is_type_listed(light_type)}
+
+def track_instancer(instancer, state = None):
+    """Index a collection instance by its instancer's name if it brings in any lights."""
+    state = state or get_light_state()
+    lights = get_instanced_lights(instancer.instance_collection) if is_instancer(instancer) else []
+    if not lights:
+        if instancer.name in state.instancers:
+            unfilter_lights({instancer.name})
+            untrack_light(instancer.name, state)
+        return
+    bump_generation()
+    state.instancers[instancer.name] = instancer
+    words = [instancer.name, "instance", get_instanced_words(instancer.instance_collection)]
+    words += [collection.name for collection in instancer.users_collection]
+    if instancer.name not in state.search_keys and state.search_sorted is not None:
+        insort(state.search_sorted, (instancer.name.lower(), instancer.name))
+    state.search_keys[instancer.name] = "\t".join(words).lower()
+    state.list_filter = None
+    if is_instance_listed(instancer, get_listed_types()):
+        state.filtered[instancer.name] = None
+    elif instancer.name in state.filtered:
+        unfilter_lights({instancer.name})
+
+def filter_instancers(state):
+    """List the collection instances that bring in a light of a listed type, and drop the rest."""
+    if not state.instancers:
+        return
+    bump_generation()
+    listed = get_listed_types()
+    hidden = set()
+    for name, instancer in state.instancers.items():
+        if is_instance_listed(instancer, listed):
+            state.filtered[name] = None
+        elif name in state.filtered:
+            hidden.add(name)
+    if hidden:
+        unfilter_lights(hidden)
+
+def get_instanced_names():
+    """Return the names of the source lights brought in by the scene's collection instances, listed or not."""
+    return {light.name for object in bpy.context.scene.objects if is_instancer(object)
+            for light in get_instanced_lights(object.instance_collection)}
+
+def apply_instances(self, context):
+    logging.info("apply_instances")
+    refresh_lights()
+
+# Search -----------------------------------------------------------------------
+
+def get_search_key(light):
+    """Return the lowercase text a light is matched against: name, type and collections."""
+    words = [light.name, light.data.type]
+    words += [collection.name for collection in light.users_collection]
+    return "\t".join(words).lower()
+
+def sort_search_keys(state):
+    state.search_sorted = sorted((name.lower(), name) for name in state.search_keys)
+
+def reindex_search(lights):
+    """Refresh the search keys of lights that may have moved collection or changed type."""
+    state = get_light_state()
+    for light in lights:
+        if light.name in state.search_keys:
+            key = get_search_key(light)
+            if state.search_keys[light.name] != key:
+                state.search_keys[light.name] = key
+                state.list_filter = None
+
+def match_search(key, tokens):
+    for token in tokens:
+        if "*" in token or "?" in token or "[" in token:
+            if not fnmatchcase(key, f"*{token}*"):
+                return False
+        elif token not in key:
+            return False
+    return True
+
+@profiled
+def filter_lights(items, filter_name, sort_alpha, bitflag):
+    """Return UIList flags and sort order showing the listed lights that match every word of filter_name."""
+    state = peek_light_state()
+    if not state.filtered:
+        return [0] * len(items), []
+    cached = state.list_filter
+    if (cached is None or cached["generation"] != desk_generation
+            or len(cached["names"]) != len(items)):
+        names = items.keys()
+        filtered = state.filtered
+        cached = state.list_filter = {"generation": desk_generation,
+                                      "names": names,
+                                      "listed": [index for index, name in enumerate(names) if name in filtered],
+                                      "filter": None,
+                                      "matched": None,
+                                      "flags": [],
+                                      "order": None}
+    names = cached["names"]
+    filter_name = filter_name.lower()
+    if filter_name != cached["filter"]:
+        tokens = filter_name.split()
+        matched = cached["listed"]
+        if tokens:
+            # A longer pattern can match more once its bracket closes, e.g. "a[b" then "a[b]".
+            if (cached["filter"] and filter_name.startswith(cached["filter"])
+                    and "[" not in filter_name):
+                matched = cached["matched"]
+            keys = state.search_keys
+            matched = [index for index in matched
+                       if match_search(keys.get(names[index]) or names[index].lower(), tokens)]
+        flags = [0] * len(names)
+        for index in matched:
+            flags[index] = bitflag
+        cached["filter"] = filter_name
+        cached["matched"] = matched
+        cached["flags"] = flags
+    order = []
+    if sort_alpha and state.search_sorted is not None:
+        if cached["order"] is None:
+            ranks = {name: rank for rank, (_, name) in enumerate(state.search_sorted)}
+            positions = np.fromiter((ranks.get(name, -1) for name in names), dtype = np.int64, count = len(names))
+            cached["order"] = np.argsort(np.argsort(positions, kind = 'stable'), kind = 'stable').tolist()
+        order = cached["order"]
+    return cached["flags"], order
 
 # Channels ---------------------------------------------------------------------
 
+def index_channels():
+    """Rebuild the object -> channel and channel -> index maps for the scene."""
+    logging.info("index_channels")
+    bump_generation()
+    state = get_desk_state()
+    state.channel_objects = {}
+    state.channel_indices = {}
+    for index, channel in enumerate(bpy.context.scene.lightdesk.channels):
+        state.channel_indices[channel.name] = index
+        if channel.object:
+            state.channel_objects[channel.object.as_pointer()] = channel.name
+
+def get_channel_state():
+    state = get_desk_state()
+    if state.channel_indices is None:
+        index_channels()
+    return state
+
 def get_channel(light):
-    channels = bpy.context.scene.lightdesk.channels
-    for channel in channels:
-        if channel.object == light:
-            return channel.name
-    return None
+    if light is None:
+        return None
+    channel_objects = get_channel_state().channel_objects
+    channel_name = channel_objects.get(light.as_pointer())
+    if channel_name is not None:
+        index = get_channel_index(channel_name)
+        if index < 0 or bpy.context.scene.lightdesk.channels[index].object != light:
+            del channel_objects[light.as_pointer()]
+            channel_name = None
+    return channel_name
 
 def get_channel_index(channel_name):
-    channels = bpy.context.scene.lightdesk.channels
-    return channels.find(channel_name)
+    state = get_channel_state()
+    index = state.channel_indices.get(channel_name, -1)
+    if index >= 0:
+        channels = bpy.context.scene.lightdesk.channels
+        if index >= len(channels) or channels[index].name != channel_name:
+            logging.warning("get_channel_index: stale index for %s", channel_name)
+            index_channels()
+            index = state.channel_indices.get(channel_name, -1)
+    return index
 
 def add_channel(channel_name, light):
-    logging.info(f"add_channel {channel_name} {light}")
+    logging.info("add_channel %s %s", channel_name, light)
     channels = bpy.context.scene.lightdesk.channels
     if get_channel_index(channel_name) < 0:
+        bump_generation()
         channel = channels.add()
         channel.name = channel_name
         channel.object = light
+        state = get_channel_state()
+        state.channel_indices[channel_name] = len(channels) - 1
+        if light:
+            state.channel_objects[light.as_pointer()] = channel_name
 
 def create_channel(light):
-    logging.info(f"create_channel {light}")
+    logging.info("create_channel %s", light)
     if not get_channel(light):
         channel_name = get_channel_name()
         add_channel(channel_name, light)
-        add_panel(channel_name, light)
+        if not is_list_view():
+            add_panel(channel_name, light)
 
 def pop_channel(channel_name):
-    logging.info(f"pop_channel {channel_name}")
+    logging.info("pop_channel %s", channel_name)
     channels = bpy.context.scene.lightdesk.channels
     index = get_channel_index(channel_name)
     if index >= 0:
-        channel = channels.remove(index)
+        bump_generation()
+        light = channels[index].object
+        channels.remove(index)
+        state = get_channel_state()
+        del state.channel_indices[channel_name]
+        if index < len(channels):
+            for name, position in state.channel_indices.items():
+                if position > index:
+                    state.channel_indices[name] = position - 1
+        if light and state.channel_objects.get(light.as_pointer()) == channel_name:
+            del state.channel_objects[light.as_pointer()]
+        elif not light:
+            for key in [key for key, name in state.channel_objects.items() if name == channel_name]:
+                del state.channel_objects[key]
 
 def kill_channel(channel_name):
-    logging.info(f"kill_channel {channel_name}")
-    detach_panel(channel_name)
+    logging.info("kill_channel %s", channel_name)
+    remove_panels({channel_name})
     pop_channel(channel_name)
+    if "stash_objects" in bpy.context.scene.lightdesk:
+        update_solo()
 
 def purge_channels():
+    """Remove every channel and its panel in one batch. Returns the count and the time taken."""
     logging.info("purge_channels")
+    start = time.perf_counter()
     channels = bpy.context.scene.lightdesk.channels
-    for channel in reversed(channels):
-        kill_channel(channel.name)
+    count = len(channels)
+    remove_panels([channel.name for channel in channels])
+    channels.clear()
+    index_channels()
+    restore_visibility()
+    if count:
+        redraw_ui()
+    return count, time.perf_counter() - start
+
+def kill_channels(channel_names):
+    logging.info("kill_channels %s", len(channel_names))
+    removed = set(channel_names)
+    remove_panels(removed)
+    lightdesk = bpy.context.scene.lightdesk
+    channels = lightdesk.channels
+    for index in reversed(range(len(channels))):
+        if channels[index].name in removed:
+            channels.remove(index)
+    index_channels()
+    if "stash_objects" in lightdesk:
+        update_solo()
 
 def deadhead_channels():
+    """Remove channels whose light has left the scene and its instances, and groups left without members."""
     logging.info("deadhead_channels")
     channels = bpy.context.scene.lightdesk.channels
-    for channel in reversed(channels):
-        if channel.name:
-            try:
-                class_path = f"bpy.types.{channel.name}"
-                panel_class = eval(class_path)
-                if not does_light_exist(channel.object.name):
-                    kill_channel(channel.name)
-            except Exception as e:
-                logging.warning(e)
-                kill_channel(channel.name)
-        else:
+    lights = set(bpy.context.scene.objects.keys()) | get_instanced_names()
+    for channel in channels:
+        if channel.is_group:
+            prune_group(channel, lights)
+    dead = [channel.name for channel in channels
+            if (not channel.is_group and (not channel.object or channel.object.name not in lights))
+            or (channel.is_group and not len(channel.members))]
+    if dead:
+        if "" in dead:
             logging.warning("deadhead_channels: invalid channel name")
-            kill_channel(channel.name)
+        kill_channels(dead)
+
+# Bulk -------------------------------------------------------------------------
+
+def get_data_indices(collection, ids):
+    """Map datablocks to their indices in a bpy.data collection, -1 where missing or None."""
+    keys = {item.as_pointer(): index for index, item in enumerate(collection[:])}
+    return np.fromiter((keys.get(item.as_pointer(), -1) if item else -1 for item in ids), dtype = np.int64, count = len(ids))
+
+def get_named_indices(collection, names):
+    """Map stored names to their indices in a bpy.data collection, preferring local datablocks to linked ones."""
+    keys = {}
+    for index, item in enumerate(collection[:]):
+        if item.library is None or item.name not in keys:
+            keys[item.name] = index
+    return np.fromiter((keys.get(name, -1) for name in names), dtype = np.int64, count = len(names))
+
+def read_array(collection, attribute, width = 1, dtype = np.float32):
+    """Read attribute for every item of collection with a single foreach_get."""
+    array = np.empty(len(collection) * width, dtype = dtype)
+    collection.foreach_get(attribute, array)
+    return array.reshape(-1, width) if width > 1 else array
+
+def write_array(collection, attribute, indices, values, width = 1, dtype = np.float32):
+    """Write values to the items at indices in one bulk read and write, deferred to commit inside a transaction."""
+    indices = np.asarray(indices, dtype = np.int64)
+    if not len(indices):
+        return
+    if transaction_depth:
+        shape = (len(indices), width) if width > 1 else (len(indices),)
+        values = np.array(np.broadcast_to(np.asarray(values, dtype = dtype), shape))
+        for entry in transaction_writes:
+            if entry[0] == collection and entry[1:4] == (attribute, width, dtype):
+                entry[4].append((indices, values))
+                break
+        else:
+            transaction_writes.append((collection, attribute, width, dtype, [(indices, values)]))
+        return
+    array = read_array(collection, attribute, width, dtype)
+    array[indices] = values
+    collection.foreach_set(attribute, array.ravel())
+
+def tag_ids(ids):
+    """foreach_set bypasses RNA updates, so tag written datablocks for the depsgraph."""
+    if transaction_depth:
+        transaction_tags.extend(ids)
+        return
+    for id in ids:
+        id.update_tag()
+
+def tag_indices(collection, indices):
+    if len(indices):
+        items = collection[:]
+        tag_ids(items[index] for index in indices)
+
+# Transactions -----------------------------------------------------------------
+
+@contextmanager
+def transaction(undo = None):
+    """Fold a batch of desk edits into one set of writes, one update and, if undo is given, one undo step."""
+    global transaction_depth, transaction_redraw
+    transaction_depth += 1
+    if transaction_depth > 1:
+        try:
+            yield
+        finally:
+            transaction_depth -= 1
+        return
+    logging.info("transaction")
+    try:
+        yield
+        commit_transaction(undo)
+    finally:
+        transaction_depth = 0
+        transaction_redraw = False
+        transaction_writes.clear()
+        transaction_tags.clear()
+
+@profiled
+def commit_transaction(undo):
+    global transaction_depth, transaction_redraw
+    logging.info("commit_transaction %s", len(transaction_writes))
+    for collection, attribute, width, dtype, pending in transaction_writes:
+        array = read_array(collection, attribute, width, dtype)
+        for indices, values in pending:
+            array[indices] = values
+        collection.foreach_set(attribute, array.ravel())
+    tagged = {}
+    for id in transaction_tags:
+        tagged.setdefault(id.as_pointer(), id)
+    for id in tagged.values():
+        id.update_tag()
+    # Let the handler see this one evaluation, so lights added in the block are indexed.
+    transaction_depth = 0
+    get_desk_state().contribution = None
+    bpy.context.view_layer.update()
+    if transaction_redraw:
+        transaction_redraw = False
+        redraw_windows()
+    # Background mode has no undo stack to push to.
+    if undo and not bpy.app.background:
+        bpy.ops.ed.undo_push(message = undo)
+
+def get_tracked_lights():
+    """Return the light objects in the scene's light index."""
+    return list(get_light_state().lights.values())
+
+def get_channel_lights():
+    """Return every light driven by a channel, including group members, once each."""
+    lights = {}
+    for channel in bpy.context.scene.lightdesk.channels:
+        for light in get_members(channel):
+            lights.setdefault(light.as_pointer(), light)
+    return list(lights.values())
+
+def read_light_state(lights):
+    """Return energy, color, hide_viewport and hide_render arrays for lights."""
+    data_indices = get_data_indices(bpy.data.lights, [light.data for light in lights])
+    object_indices = get_data_indices(bpy.data.objects, lights)
+    return (read_array(bpy.data.lights, "energy")[data_indices],
+            read_array(bpy.data.lights, "color", 3)[data_indices],
+            read_array(bpy.data.objects, "hide_viewport", dtype = bool)[object_indices],
+            read_array(bpy.data.objects, "hide_render", dtype = bool)[object_indices])
+
+# Groups -----------------------------------------------------------------------
+
+def create_group(lights, label = "Group"):
+    """Create a group channel driving all of lights from one set of controls."""
+    logging.info("create_group %s %s", label, len(lights))
+    lights = list({light.as_pointer(): light for light in lights if light}.values())
+    if not lights:
+        return None
+    channel_name = get_channel_name()
+    add_channel(channel_name, None)
+    channel = bpy.context.scene.lightdesk.channels[get_channel_index(channel_name)]
+    channel.is_group = True
+    channel.label = get_group_label(label, channel)
+    for light in lights:
+        member = channel.members.add()
+        member.name = light.name
+        member.object = light
+    capture_group(channel)
+    if not is_list_view():
+        add_panel(channel_name, None)
+    redraw_ui()
+    return channel_name
+
+def get_group_label(label, channel = None):
+    """Return label, numbered like Blender's own names if another group of the scene already uses it."""
+    taken = {other.label for other in bpy.context.scene.lightdesk.channels
+             if other.is_group and other.name != getattr(channel, "name", None)}
+    base, unique, number = label, label, 0
+    if base[-4:-3] == "." and base[-3:].isdigit():
+        base = base[:-4]
+    while unique in taken:
+        number += 1
+        unique = f"{base}.{number:03}"
+    return unique
+
+def apply_group_label(self, context):
+    label = get_group_label(self.label, self)
+    if label != self.label:
+        self["label"] = label
+
+def get_group_entry(channel):
+    """Return a group's cached members, rebuilt when they or the lights and objects in bpy.data are added or removed."""
+    state = get_desk_state()
+    key = (len(channel.members), len(bpy.data.lights), len(bpy.data.objects))
+    entry = state.groups.get(channel.name)
+    if entry is None or entry["key"] != key:
+        lights = [member.object for member in channel.members]
+        entry = state.groups[channel.name] = {"key": key,
+                                              "objects": lights,
+                                              "lights": [light.data if light else None for light in lights]}
+    return entry
+
+def get_group_lights(channel):
+    return get_group_entry(channel)["objects"]
+
+def get_group_indices(channel, collection):
+    """Return the indices of a group's members in bpy.data.lights or bpy.data.objects, and the ids at them."""
+    entry = get_group_entry(channel)
+    ids = entry[collection]
+    indices = entry.get((collection, "indices"))
+    try:
+        # Renaming any datablock re-sorts bpy.data, so check the indices still point at the members.
+        items = getattr(bpy.data, collection)[:]
+        if indices is None or not all(items[index] == id for index, id in zip(indices, ids) if index >= 0):
+            indices = entry[collection, "indices"] = get_data_indices(getattr(bpy.data, collection), ids)
+    except ReferenceError:
+        get_desk_state().groups.pop(channel.name, None)
+        return get_group_indices(channel, collection)
+    return indices, ids
+
+def capture_group(channel):
+    """Store the members' current power and color as the group's base values."""
+    logging.info("capture_group %s", channel.name)
+    data_indices, data = get_group_indices(channel, "lights")
+    valid = data_indices >= 0
+    energy = np.zeros(len(data), dtype = np.float32)
+    color = np.ones((len(data), 3), dtype = np.float32)
+    energy[valid] = read_array(bpy.data.lights, "energy")[data_indices[valid]]
+    color[valid] = read_array(bpy.data.lights, "color", 3)[data_indices[valid]]
+    channel.members.foreach_set("energy", energy)
+    channel.members.foreach_set("color", color.ravel())
+    channel["gain"] = 1.0
+    channel["tint"] = (1.0, 1.0, 1.0)
+
+def write_group_power(channel):
+    data_indices, data = get_group_indices(channel, "lights")
+    valid = data_indices >= 0
+    energy = read_array(channel.members, "energy")
+    write_array(bpy.data.lights, "energy", data_indices[valid], energy[valid] * channel.gain)
+    tag_ids(light for light, ok in zip(data, valid) if ok)
+
+def write_group_color(channel):
+    data_indices, data = get_group_indices(channel, "lights")
+    valid = data_indices >= 0
+    color = read_array(channel.members, "color", 3)
+    tint = np.array(channel.tint, dtype = np.float32)
+    write_array(bpy.data.lights, "color", data_indices[valid], color[valid] * tint, 3)
+    tag_ids(light for light, ok in zip(data, valid) if ok)
+
+def write_group_visibility(channel, attribute):
+    object_indices, lights = get_group_indices(channel, "objects")
+    valid = object_indices >= 0
+    write_array(bpy.data.objects, attribute, object_indices[valid], getattr(channel, attribute), dtype = bool)
+    tag_ids(light for light, ok in zip(lights, valid) if ok)
+
+def apply_group_power(self, context):
+    write_group_power(self)
+
+def apply_group_color(self, context):
+    write_group_color(self)
+
+def apply_group_viewport(self, context):
+    write_group_visibility(self, "hide_viewport")
+
+def apply_group_render(self, context):
+    write_group_visibility(self, "hide_render")
+
+def prune_group(channel, object_names):
+    """Drop members whose light is no longer in the scene."""
+    members = channel.members
+    for index in reversed(range(len(members))):
+        light = members[index].object
+        if not light or light.name not in object_names:
+            members.remove(index)
+            get_desk_state().groups.pop(channel.name, None)
+
+# Solo -------------------------------------------------------------------------
+
+def get_members(channel):
+    """Return the light objects a channel drives."""
+    if channel.is_group:
+        return [light for light in get_group_lights(channel) if light]
+    return [channel.object] if channel.object else []
+
+def stash_visibility(light_names):
+    """Remember the visibility of lights not yet in the scene's stash."""
+    lightdesk = bpy.context.scene.lightdesk
+    stashed = list(lightdesk.get("stash_objects", []))
+    known = set(stashed)
+    names = [name for name in light_names if name not in known]
+    if not names and stashed:
+        return stashed
+    indices = get_named_indices(bpy.data.objects, names)
+    viewport = list(lightdesk.get("stash_viewport", []))
+    render = list(lightdesk.get("stash_render", []))
+    viewport += read_array(bpy.data.objects, "hide_viewport", dtype = bool)[indices].astype(np.int8).tolist()
+    render += read_array(bpy.data.objects, "hide_render", dtype = bool)[indices].astype(np.int8).tolist()
+    stashed += names
+    lightdesk["stash_objects"] = stashed
+    lightdesk["stash_viewport"] = viewport
+    lightdesk["stash_render"] = render
+    return stashed
+
+def write_visibility(light_names, hide_viewport, hide_render):
+    indices = get_named_indices(bpy.data.objects, light_names)
+    valid = indices >= 0
+    write_array(bpy.data.objects, "hide_viewport", indices[valid], hide_viewport[valid], dtype = bool)
+    write_array(bpy.data.objects, "hide_render", indices[valid], hide_render[valid], dtype = bool)
+    tag_indices(bpy.data.objects, indices[valid])
+
+def restore_visibility():
+    """Write the stashed visibility back and forget it."""
+    lightdesk = bpy.context.scene.lightdesk
+    if "stash_objects" not in lightdesk:
+        return
+    logging.info("restore_visibility")
+    write_visibility(list(lightdesk["stash_objects"]),
+                     np.array(lightdesk["stash_viewport"], dtype = bool),
+                     np.array(lightdesk["stash_render"], dtype = bool))
+    for key in ("stash_objects", "stash_viewport", "stash_render"):
+        del lightdesk[key]
+
+def release_visibility(light_names):
+    """Write back and forget the stashed visibility of lights that aren't in light_names, as they left the desk."""
+    lightdesk = bpy.context.scene.lightdesk
+    if "stash_objects" not in lightdesk:
+        return
+    stashed = list(lightdesk["stash_objects"])
+    kept = [index for index, name in enumerate(stashed) if name in light_names]
+    if len(kept) == len(stashed):
+        return
+    logging.info("release_visibility %s", len(stashed) - len(kept))
+    gone = [index for index, name in enumerate(stashed) if name not in light_names]
+    viewport = np.array(lightdesk["stash_viewport"], dtype = bool)
+    render = np.array(lightdesk["stash_render"], dtype = bool)
+    write_visibility([stashed[index] for index in gone], viewport[gone], render[gone])
+    lightdesk["stash_objects"] = [stashed[index] for index in kept]
+    lightdesk["stash_viewport"] = viewport[kept].astype(np.int8).tolist()
+    lightdesk["stash_render"] = render[kept].astype(np.int8).tolist()
+
+def update_solo():
+    """Hide the lights of muted channels, and all but soloed ones, restoring the stashed visibility once none are."""
+    logging.info("update_solo")
+    channels = bpy.context.scene.lightdesk.channels
+    soloed = set()
+    muted = set()
+    engaged = False
+    for channel in channels:
+        if channel.solo or channel.mute:
+            engaged = True
+            names = {light.name for light in get_members(channel)}
+            if channel.solo:
+                soloed |= names
+            if channel.mute:
+                muted |= names
+    if not engaged:
+        restore_visibility()
+        return
+    lightdesk = bpy.context.scene.lightdesk
+    names = [light.name for light in get_channel_lights()]
+    release_visibility(set(names))
+    stashed = stash_visibility(names)
+    hidden = np.array([bool(soloed and name not in soloed) or name in muted for name in stashed], dtype = bool)
+    write_visibility(stashed,
+                     np.array(lightdesk["stash_viewport"], dtype = bool) | hidden,
+                     np.array(lightdesk["stash_render"], dtype = bool) | hidden)
+
+def apply_solo(self, context):
+    with transaction():
+        update_solo()
+
+def get_channel_label(channel):
+    if channel.is_group:
+        return f"{channel.label} ({len(channel.members)})"
+    return channel.object.name if channel.object else "(missing light)"
+
+# Looks ------------------------------------------------------------------------
+
+def capture_look(look):
+    """Store the power, color and visibility of every tracked light in look as flat arrays."""
+    logging.info("capture_look %s", look.name)
+    lights = get_tracked_lights()
+    object_names = [light.name for light in lights]
+    data_names = [light.data.name for light in lights]
+    data_indices = get_data_indices(bpy.data.lights, [light.data for light in lights])
+    object_indices = get_data_indices(bpy.data.objects, lights)
+    look["objects"] = object_names
+    look["lights"] = data_names
+    look["energy"] = read_array(bpy.data.lights, "energy")[data_indices].tolist()
+    look["color"] = read_array(bpy.data.lights, "color", 3)[data_indices].ravel().tolist()
+    look["hide_viewport"] = read_array(bpy.data.objects, "hide_viewport", dtype = bool)[object_indices].astype(np.int8).tolist()
+    look["hide_render"] = read_array(bpy.data.objects, "hide_render", dtype = bool)[object_indices].astype(np.int8).tolist()
+
+def recall_look(look):
+    """Write a captured look back to its lights. Lights that have gone are skipped."""
+    logging.info("recall_look %s", look.name)
+    if "lights" not in look:
+        return 0
+    data_indices = get_named_indices(bpy.data.lights, list(look["lights"]))
+    object_indices = get_named_indices(bpy.data.objects, list(look["objects"]))
+    lights = data_indices >= 0
+    objects = object_indices >= 0
+    energy = np.array(look["energy"], dtype = np.float32)
+    color = np.array(look["color"], dtype = np.float32).reshape(-1, 3)
+    write_array(bpy.data.lights, "energy", data_indices[lights], energy[lights])
+    write_array(bpy.data.lights, "color", data_indices[lights], color[lights], 3)
+    for attribute in ("hide_viewport", "hide_render"):
+        values = np.array(look[attribute], dtype = bool)
+        write_array(bpy.data.objects, attribute, object_indices[objects], values[objects], dtype = bool)
+    tag_indices(bpy.data.lights, data_indices[lights])
+    tag_indices(bpy.data.objects, object_indices[objects])
+    return int(np.count_nonzero(lights))
+
+def add_look(name):
+    lightdesk = bpy.context.scene.lightdesk
+    look = lightdesk.looks.add()
+    look.name = name
+    capture_look(look)
+    lightdesk.look_selected = len(lightdesk.looks) - 1
+    return look
+
+def get_selected_look():
+    lightdesk = bpy.context.scene.lightdesk
+    if 0 <= lightdesk.look_selected < len(lightdesk.looks):
+        return lightdesk.looks[lightdesk.look_selected]
+    return None
+
+# Analysis ---------------------------------------------------------------------
+
+def estimate_contributions(lights, camera):
+    """Estimate a rough, relative score of how much each light contributes to what camera sees."""
+    logging.info("estimate_contributions %s %s", len(lights), camera.name)
+    count = len(lights)
+    light_info = get_light_state().light_info
+    types = np.array([light_info.get(light.name, (light.data.type, ))[0] for light in lights])
+    object_indices = get_data_indices(bpy.data.objects, list(lights) + [camera])
+    data_indices = get_data_indices(bpy.data.lights, [light.data for light in lights])
+    # matrix_world is read column-major: [:, 2] is the Z axis and [:, 3] the translation.
+    matrices = read_array(bpy.data.objects, "matrix_world", 16)[object_indices].reshape(-1, 4, 4)
+    positions = matrices[:count, 3, :3]
+    aims = -matrices[:count, 2, :3]
+    aims /= np.maximum(np.linalg.norm(aims, axis = 1), 1e-6)[:, None]
+    origin = matrices[count, 3, :3]
+    forward = -matrices[count, 2, :3]
+    forward /= max(np.linalg.norm(forward), 1e-6)
+    energy = read_array(bpy.data.lights, "energy")[data_indices]
+    color = read_array(bpy.data.lights, "color", 3)[data_indices]
+    hidden = read_array(bpy.data.objects, "hide_render", dtype = bool)[object_indices[:count]]
+    luminance = color @ np.array((0.2126, 0.7152, 0.0722), dtype = np.float32)
+
+    offsets = positions - origin
+    distance = np.linalg.norm(offsets, axis = 1)
+    along = offsets @ forward
+    half_fov = camera.data.angle / 2
+    outside = np.maximum(np.arccos(np.clip(along / np.maximum(distance, 1e-6), -1.0, 1.0)) - half_fov, 0.0)
+    frustum = 0.1 + 0.9 * np.exp(-(outside / half_fov) ** 2)
+    targets = origin + forward * np.maximum(along, 0.1)[:, None]
+    to_target = targets - positions
+    aim = np.arccos(np.clip(np.sum(aims * to_target, axis = 1) / np.maximum(np.linalg.norm(to_target, axis = 1), 1e-6), -1.0, 1.0))
+
+    size = np.full(count, 0.1, dtype = np.float32)
+    cone = np.ones(count, dtype = np.float32)
+    spots = np.flatnonzero(types == 'SPOT')
+    if len(spots):
+        half_cone = np.array([lights[index].data.spot_size for index in spots], dtype = np.float32) / 2
+        cone[spots] = np.where(aim[spots] <= half_cone, 1.0, np.exp(-((aim[spots] - half_cone) / 0.2) ** 2))
+    areas = np.flatnonzero(types == 'AREA')
+    if len(areas):
+        size[areas] = [lights[index].data.size for index in areas]
+        cone[areas] = np.maximum(np.cos(aim[areas]), 0.05)
+    scores = luminance * energy / (4 * math.pi * np.maximum(distance, size) ** 2) * frustum * cone
+    suns = types == 'SUN'
+    scores[suns] = luminance[suns] * energy[suns]
+    scores[hidden] = 0.0
+    return scores
+
+@profiled
+def get_contributions():
+    """Return the tracked lights and their scores for the scene camera, cached until a light or the camera changes."""
+    scene = bpy.context.scene
+    camera = scene.camera
+    if camera is None:
+        return [], np.zeros(0, dtype = np.float32)
+    state = get_light_state()
+    key = (camera.as_pointer(), scene.frame_current)
+    if state.contribution is None or state.contribution[0] != key:
+        lights = get_tracked_lights()
+        scores = estimate_contributions(lights, camera) if lights else np.zeros(0, dtype = np.float32)
+        state.contribution = (key, lights, scores)
+    return state.contribution[1], state.contribution[2]
+
+def fill_top_lights(count):
+    """Create channels for the count displayed lights that contribute most to the camera view."""
+    logging.info("fill_top_lights %s", count)
+    lights, scores = get_contributions()
+    listed = get_light_state().filtered
+    ranked = [lights[index] for index in np.argsort(-scores, kind = 'stable') if lights[index].name in listed]
+    return assign_lights(ranked[:count])
+
+def mute_weak_channels(threshold):
+    """Mute channels whose light scores below threshold times the strongest light's score."""
+    logging.info("mute_weak_channels %s", threshold)
+    lights, scores = get_contributions()
+    if not len(scores):
+        return 0
+    weak = {light.name for light, score in zip(lights, scores) if score < threshold * scores.max()}
+    muted = 0
+    for channel in bpy.context.scene.lightdesk.channels:
+        if not channel.is_group and not channel.mute and channel.object and channel.object.name in weak:
+            channel["mute"] = True
+            muted += 1
+    if muted:
+        update_solo()
+    return muted
+
+# Keys -------------------------------------------------------------------------
+
+def get_fcurve(id, data_path, index = 0):
+    animation_data = id.animation_data or id.animation_data_create()
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(f"{id.name}Action")
+    fcurves = animation_data.action.fcurves
+    fcurve = fcurves.find(data_path, index = index)
+    if fcurve is None:
+        fcurve = fcurves.new(data_path, index = index, action_group = "Lightdesk")
+    return fcurve
+
+def insert_keys(fcurve, frames, values, interpolation = None):
+    """Insert or replace keys on fcurve by filling keyframe_points in bulk."""
+    points = fcurve.keyframe_points
+    count = len(points)
+    co = np.empty(count * 2, dtype = np.float32)
+    points.foreach_get("co", co)
+    co = co.reshape(-1, 2)
+    added = []
+    for frame, value in zip(frames, values):
+        existing = np.flatnonzero(co[:, 0] == frame)
+        if len(existing):
+            co[existing, 1] = value
+        else:
+            added.append((frame, value))
+    if added:
+        points.add(len(added))
+        co = np.concatenate((co, np.array(added, dtype = np.float32)))
+    points.foreach_set("co", co.ravel())
+    if interpolation:
+        for index in range(count, count + len(added)):
+            points[index].interpolation = interpolation
+    fcurve.update()
+
+def key_lights(lights, frames, energy, color, hide_viewport, hide_render):
+    """Key power, color and visibility for lights from arrays with one row per light and one column per frame."""
+    logging.info("key_lights %s %s", len(lights), frames)
+    keyed = set()
+    for index, light in enumerate(lights):
+        if light.data.name not in keyed:
+            keyed.add(light.data.name)
+            insert_keys(get_fcurve(light.data, "energy"), frames, energy[index])
+            for channel in range(3):
+                insert_keys(get_fcurve(light.data, "color", channel), frames, color[index, :, channel])
+        insert_keys(get_fcurve(light, "hide_viewport"), frames, hide_viewport[index], 'CONSTANT')
+        insert_keys(get_fcurve(light, "hide_render"), frames, hide_render[index], 'CONSTANT')
+
+def key_desk(frame):
+    """Key the current state of every channel light at frame."""
+    lights = get_channel_lights()
+    if lights:
+        energy, color, hide_viewport, hide_render = read_light_state(lights)
+        key_lights(lights, [frame], energy[:, None], color[:, None], hide_viewport[:, None], hide_render[:, None])
+    return len(lights)
+
+def crossfade_look(look, frame, length):
+    """Key a transition to look over length frames, fading lights that hide or show through zero power."""
+    if "lights" not in look:
+        return 0
+    object_names = list(look["objects"])
+    object_indices = get_named_indices(bpy.data.objects, object_names)
+    valid = np.flatnonzero(object_indices >= 0)
+    objects = bpy.data.objects[:]
+    lights = [objects[object_indices[index]] for index in valid]
+    if not lights:
+        return 0
+    energy, color, hide_viewport, hide_render = read_light_state(lights)
+    target_energy = np.array(look["energy"], dtype = np.float32)[valid]
+    target_color = np.array(look["color"], dtype = np.float32).reshape(-1, 3)[valid]
+    target_viewport = np.array(look["hide_viewport"], dtype = bool)[valid]
+    target_render = np.array(look["hide_render"], dtype = bool)[valid]
+    fade_in = hide_render & ~target_render
+    fade_out = ~hide_render & target_render
+    key_lights(lights, [frame, frame + length],
+               np.stack((np.where(fade_in, 0.0, energy), np.where(fade_out, 0.0, target_energy)), axis = 1),
+               np.stack((color, target_color), axis = 1),
+               np.stack((hide_viewport & target_viewport, target_viewport), axis = 1),
+               np.stack((hide_render & target_render, target_render), axis = 1))
+    return len(lights)
+
+# API --------------------------------------------------------------------------
+#
+# Reads and writes desk states without touching the UI: no panels, timers,
+# handlers or bpy.context beyond the default scene. A state is a dict,
+#
+#   {"version": 1,
+#    "scene": "Scene",
+#    "lights": {"<object name>": {"energy": 10.0,
+#                                  "color": [1.0, 1.0, 1.0],
+#                                  "hide_viewport": false,
+#                                  "hide_render": false}},
+#    "groups": {"<group label>": {"gain": 1.0,
+#                                  "tint": [1.0, 1.0, 1.0],
+#                                  "hide_viewport": false,
+#                                  "hide_render": false}}}
+#
+# Every key of a light or group entry is optional, so a state can set just
+# the values that vary between lighting variants.
+
+def capture_state(scene = None):
+    """Return the channel lights and groups of scene as a desk state dict."""
+    scene = scene or bpy.context.scene
+    logging.info("capture_state %s", scene.name)
+    channels = scene.lightdesk.channels
+    lights = [channel.object for channel in channels if not channel.is_group and channel.object]
+    state = {"version": state_version, "scene": scene.name, "lights": {}, "groups": {}}
+    if lights:
+        energy, color, hide_viewport, hide_render = read_light_state(lights)
+        for index, light in enumerate(lights):
+            state["lights"][light.name] = {"energy": float(energy[index]),
+                                           "color": color[index].tolist(),
+                                           "hide_viewport": bool(hide_viewport[index]),
+                                           "hide_render": bool(hide_render[index])}
+    for channel in channels:
+        if channel.is_group:
+            state["groups"][channel.label] = {"gain": channel.gain,
+                                              "tint": list(channel.tint),
+                                              "hide_viewport": channel.hide_viewport,
+                                              "hide_render": channel.hide_render}
+    return state
+
+def apply_state(state, scene = None):
+    """Apply a desk state in bulk, groups first so lights listed on their own override them. Returns the lights written."""
+    scene = scene or bpy.data.scenes.get(state.get("scene", "")) or bpy.context.scene
+    logging.info("apply_state %s", scene.name)
+    writes = {("lights", "energy"): [],
+              ("lights", "color"): [],
+              ("objects", "hide_viewport"): [],
+              ("objects", "hide_render"): []}
+    written = set()
+    groups = {channel.label: channel for channel in scene.lightdesk.channels if channel.is_group}
+    for label, values in state.get("groups", {}).items():
+        channel = groups.get(label)
+        if channel is None:
+            logging.warning("apply_state: no group %s in %s", label, scene.name)
+            continue
+        members = [member.object for member in channel.members]
+        valid = np.array([light is not None for light in members], dtype = bool)
+        members = [light for light in members if light]
+        data = [light.data for light in members]
+        if "gain" in values:
+            channel["gain"] = values["gain"]
+            energy = read_array(channel.members, "energy")[valid] * values["gain"]
+            writes["lights", "energy"].append((data, energy))
+        if "tint" in values:
+            channel["tint"] = values["tint"]
+            color = read_array(channel.members, "color", 3)[valid] * np.array(values["tint"], dtype = np.float32)
+            writes["lights", "color"].append((data, color))
+        for attribute in ("hide_viewport", "hide_render"):
+            if attribute in values:
+                channel[attribute] = values[attribute]
+                writes["objects", attribute].append((members, np.full(len(members), values[attribute], dtype = bool)))
+        written.update(light.as_pointer() for light in members)
+    lights = get_named_indices(bpy.data.objects, list(state.get("lights", {})))
+    objects = bpy.data.objects[:]
+    for (name, values), index in zip(state.get("lights", {}).items(), lights):
+        light = objects[index] if index >= 0 else None
+        if light is None or light.type != 'LIGHT':
+            logging.warning("apply_state: no light %s", name)
+            continue
+        for (collection, attribute), pending in writes.items():
+            if attribute in values:
+                ids = [light.data if collection == "lights" else light]
+                pending.append((ids, np.array([values[attribute]])))
+        written.add(light.as_pointer())
+    for (collection, attribute), pending in writes.items():
+        if not pending:
+            continue
+        collection = getattr(bpy.data, collection)
+        ids = [item for items, values in pending for item in items]
+        width = 3 if attribute == "color" else 1
+        dtype = bool if attribute.startswith("hide") else np.float32
+        values = np.concatenate([np.asarray(values, dtype = dtype).reshape(-1, width) for items, values in pending])
+        indices = get_data_indices(collection, ids)
+        valid = indices >= 0
+        write_array(collection, attribute, indices[valid], values[valid] if width > 1 else values[valid].ravel(), width, dtype)
+        tag_indices(collection, indices[valid])
+    return len(written)
+
+def save_state(filepath, scene = None):
+    """Write the desk state of scene to a JSON file."""
+    state = capture_state(scene)
+    with open(filepath, 'w') as file:
+        json.dump(state, file, indent = 2)
+    return state
+
+def load_state(filepath, scene = None):
+    """Apply a desk state from a JSON file. Returns the number of lights written."""
+    logging.info("load_state %s", filepath)
+    with open(filepath) as file:
+        return apply_state(json.load(file), scene)
+
+def get_cli_state(argv = None):
+    """Return the file given with --lightdesk-state after -- on the command line."""
+    argv = sys.argv if argv is None else argv
+    if "--" not in argv:
+        return None
+    parser = argparse.ArgumentParser(add_help = False)
+    parser.add_argument("--lightdesk-state")
+    args, unknown = parser.parse_known_args(argv[argv.index("--") + 1:])
+    return args.lightdesk_state
+
+@persistent
+def apply_cli_state(*args):
+    filepath = get_cli_state()
+    if not filepath:
+        return
+    try:
+        count = load_state(filepath)
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logging.error("apply_cli_state %s: %s", filepath, e)
+        if bpy.app.background:
+            sys.exit(1)
+        return
+    logging.info("apply_cli_state %s: %s lights", filepath, count)
 
 # Panels -----------------------------------------------------------------------
 
+def is_list_view(scene = None):
+    return (scene or bpy.context.scene).lightdesk.view == 'LIST'
+
+def apply_view(self, context):
+    logging.info("apply_view")
+    sync_panels()
+    redraw_ui()
+
 def rebuild_ui_on_scene_change():
     if has_scene_changed():
-        rebuild_ui()
+        switch_scene()
+
+def switch_scene():
+    """Make the desks of the scenes now shown in each window active, picking up only what changed while away."""
+    logging.info("switch_scene %s", bpy.context.scene.name)
+    track_scene()
+    if has_objects_changed():
+        append_exec_queue(scan_lights)
+        append_exec_queue(deadhead_channels)
+    append_exec_queue(reconcile_windows)
+    append_exec_queue(trim_desk_states)
+    redraw_ui()
 
 def get_channel_name():
     logging.info("get_channel_name")
     return f"LIGHTDESK_PT_{str(uuid4().hex)}"
 
-def get_panel_index(panel_name):
-    logging.info(f"get_panel_index {panel_name}")
-    panels = bpy.context.window_manager.lightdesk.panels
-    return panels.find(panel_name)
-
 def register_panel(panel_name):
-    logging.info(f"register_panel {panel_name}")
+    logging.info("register_panel %s", panel_name)
+    if panel_name in panel_classes:
+        return
     panel = type(panel_name, (LIGHTDESK_PT_channel, Panel, ), {"bl_idname" : panel_name,})
     register_class(panel)
+    panel_classes[panel_name] = panel
 
 def unregister_panel(panel_name):
-    logging.info(f"unregister_panel {panel_name}")
-    class_path = f"bpy.types.{panel_name}"
-    try:
-        panel_class = eval(class_path)
-    except Exception as e:
-        logging.warning(e)
+    logging.info("unregister_panel %s", panel_name)
+    panel_class = panel_classes.pop(panel_name, None)
+    if panel_class is None:
+        # Registered by an earlier instance of the module, e.g. after a reload.
+        panel_class = getattr(bpy.types, panel_name, None)
+    if panel_class is None:
+        logging.warning("unregister_panel: %s is not registered", panel_name)
     else:
         unregister_class(panel_class)
 
 def add_panel(panel_name, light):
-    logging.info(f"add_panel {panel_name} {light}")
-    panels = bpy.context.window_manager.lightdesk.panels
-    if get_panel_index(panel_name) < 0:
-        panel = panels.add()
-        panel.name = panel_name
-        panel.object = light
-        register_panel(panel_name)
+    logging.info("add_panel %s %s", panel_name, light)
+    add_panels([panel_name], [light])
 
-def detach_panel(panel_name):
-    logging.info(f"detach_panel {panel_name}")
+def add_panels(panel_names, lights, state = None):
+    logging.info("add_panels %s", len(panel_names))
     panels = bpy.context.window_manager.lightdesk.panels
-    index = get_panel_index(panel_name)
-    if index >= 0:
-        unregister_panel(panel_name)
-        panels.remove(index)
+    state = state or get_desk_state()
+    if state.panels is None:
+        state.panels = set()
+    added = []
+    for panel_name, light in zip(panel_names, lights):
+        if panel_name not in panel_classes:
+            panel = panels.add()
+            panel.name = panel_name
+            panel.object = light
+            added.append(panel_name)
+        state.panels.add(panel_name)
+    for panel_name in added:
+        register_panel(panel_name)
 
-def rebuild_panels():
-    logging.info("rebuild_panels")
+def remove_panels(panel_names, state = None):
+    logging.info("remove_panels %s", len(panel_names))
     panels = bpy.context.window_manager.lightdesk.panels
+    removed = set(panel_names)
+    state = state or get_desk_state()
+    if state.panels:
+        state.panels -= removed
     for panel in panels:
-        register_panel(panel.name)
+        if panel.name in removed and panel.name in panel_classes:
+            unregister_panel(panel.name)
+    for key in [key for key in draw_cache if key[1] in removed]:
+        del draw_cache[key]
+    for index in reversed(range(len(panels))):
+        if panels[index].name in removed:
+            panels.remove(index)
+
+def reconcile_panels(scene = None):
+    """Job: register the missing panels of scene's channels and drop those it no longer needs, yielding progress."""
+    scene = scene or bpy.context.scene
+    logging.info("reconcile_panels %s", scene.name)
+    state = get_desk_state(scene)
+    if state.panels is None:
+        state.panels = set()
+    channels = scene.lightdesk.channels
+    wanted = set() if is_list_view(scene) else set(channels.keys())
+    stale = state.panels - wanted
+    if stale:
+        remove_panels(stale, state)
+    missing = [(channel.name, channel.object) for channel in channels
+               if channel.name in wanted and channel.name not in state.panels]
+    for start in range(0, len(missing), job_chunk):
+        chunk = missing[start:start + job_chunk]
+        add_panels([name for name, light in chunk], [light for name, light in chunk], state)
+        yield (start + len(chunk)) / len(missing)
+
+def sync_panels():
+    logging.info("sync_panels")
+    run_job(reconcile_panels())
+
+def reconcile_windows():
+    """Job: reconcile the panels of every scene shown in a window, yielding progress."""
+    logging.info("reconcile_windows")
+    scenes = list(dict.fromkeys(window.scene for window in bpy.context.window_manager.windows))
+    for scene in scenes or [bpy.context.scene]:
+        yield from reconcile_panels(scene)
+
+def get_panel_channel(panel_name):
+    """Return the channel and light drawn by a panel, resolved once per desk generation."""
+    # Windows showing different scenes, e.g. a full copy, draw the same panel names.
+    key = (bpy.context.scene.as_pointer(), panel_name)
+    entry = draw_cache.get(key)
+    if entry is None or entry[0] != desk_generation:
+        index = get_channel_index(panel_name)
+        channel = bpy.context.scene.lightdesk.channels[index] if index >= 0 else None
+        entry = draw_cache[key] = (desk_generation, channel, channel and channel.object)
+    return entry[1], entry[2]
+
+def redraw_ui():
+    global transaction_redraw
+    if transaction_depth:
+        transaction_redraw = True
+        return
+    redraw_windows()
+
+def redraw_windows():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                for region in area.regions:
+                    if region.type == 'UI':
+                        region.tag_redraw()
 
 def purge_panels():
+    """Unregister the panels of every scene."""
     logging.info("purge_panels")
     panels = bpy.context.window_manager.lightdesk.panels
-    for panel in reversed(panels):
-        detach_panel(panel.name)
+    for panel_name in set(panels.keys()) | panel_classes.keys():
+        unregister_panel(panel_name)
+    panels.clear()
+    draw_cache.clear()
+    for state in desk_states.values():
+        state.panels = None
 
-def deadhead_panels():
-    logging.info("deadhead_panels")
+def rebuild_panels():
+    """Job: re-register the current scene's panels from its channels, yielding progress."""
+    logging.info("rebuild_panels")
+    state = get_desk_state()
+    if state.panels:
+        remove_panels(set(state.panels), state)
     panels = bpy.context.window_manager.lightdesk.panels
-    for panel in reversed(panels):
-        if panel.name:
-            try:
-                class_path = f"bpy.types.{panel.name}"
-                cls = eval(class_path)
-            except Exception as e:
-                logging.warning(e)
-                detach_panel(panel.name)
-                pop_channel(panel.name)
-        else:
-            logging.warning(f"deadhead_panels: invalid panel name")
-            detach_panel(panel.name)
-            pop_channel(panel.name)
+    for index in reversed(range(len(panels))):
+        if panels[index].name not in panel_classes:
+            panels.remove(index)
+    yield from reconcile_panels()
+    track_scene()
 
+@profiled
 def rebuild_ui():
+    """Re-register the current scene's panels from its channels."""
     logging.info("rebuild_ui")
-    purge_panels()
-    panels = bpy.context.window_manager.lightdesk.panels
-    channels = bpy.context.scene.lightdesk.channels
-    for channel in channels:
-        panel = panels.add()
-        panel.name = channel.name
-    rebuild_panels()
-    track_scene()
+    cancel_job(rebuild_panels)
+    run_job(rebuild_panels())
 
 # Operators ====================================================================
 
@@ -440,10 +2233,48 @@ class LIGHTDESK_OT_debug(Operator):
 
     def execute(self, context):
         logging.info("")
-        logging.info(f"OPERATOR {self}")
+        logging.info("OPERATOR %s", self)
         debug_data()
         return{'FINISHED'}
 
+class LIGHTDESK_OT_dump_profile(Operator):
+    bl_idname = "lightdesk.dump_profile"
+    bl_label = "Dump profile data to file"
+    bl_options = {'INTERNAL'}
+
+    filepath : StringProperty(subtype = 'FILE_PATH', default = "lightdesk_profile.json")
+
+    @classmethod
+    def poll(cls, context):
+        return bool(profile_stats)
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        dump_profile(self.filepath)
+        self.report({'INFO'}, f"Profile written to {self.filepath}")
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_activate(Operator):
+    bl_idname = "lightdesk.activate"
+    bl_label = "Activate Lightdesk"
+    bl_description = "Scan the scene for lights and start tracking changes"
+    bl_options = {'INTERNAL'}
+
+    @classmethod
+    def poll(cls, context):
+        return not active
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        activate()
+        return {'FINISHED'}
+
 class LIGHTDESK_OT_refresh(Operator):
     bl_idname = "lightdesk.refresh"
     bl_label = "Refresh UI"
@@ -455,7 +2286,7 @@ class LIGHTDESK_OT_refresh(Operator):
 
     def execute(self, context):
         logging.info("")
-        logging.info(f"OPERATOR {self}")
+        logging.info("OPERATOR %s", self)
         refresh_lights()
         rebuild_ui()
         return{'FINISHED'}
@@ -467,32 +2298,222 @@ class LIGHTDESK_OT_assign_light(Operator):
 
     @classmethod
     def poll(cls, context):
-        lightdesk = context.scene.lightdesk
-        assigned = False
-        if lightdesk.selected >= 0:
-            assigned = get_channel(lightdesk.filtered[lightdesk.selected].object)
-        return lightdesk.selected >= 0 and not assigned
+        if any(not get_channel(light) for light in get_selected_lights()):
+            return True
+        return any(not get_channel(light) for light in get_selected_objects(context))
 
     def execute(self, context):
         logging.info("")
-        logging.info(f"OPERATOR {self}")
-        lightdesk = context.scene.lightdesk
-        assign_light(lightdesk.filtered[lightdesk.selected].object)
+        logging.info("OPERATOR %s", self)
+        lights = get_selected_lights() + get_selected_objects(context)
+        count, elapsed = assign_lights(lights)
+        if count > 1:
+            self.report({'INFO'}, f"Created {count} channels in {elapsed * 1000:.1f} ms")
         return {'FINISHED'}
 
 class LIGHTDESK_OT_fill_lights(Operator):
     bl_idname = "lightdesk.fill_lights"
     bl_label = "Add all displayed lights"
-    bl_options = {'INTERNAL'}
+    bl_options = {'INTERNAL', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
-        return bool(context.scene.lightdesk and len(context.scene.lightdesk.filtered))
+        return bool(context.scene.lightdesk and peek_light_state().filtered)
 
     def execute(self, context):
         logging.info("")
-        logging.info(f"OPERATOR {self}")
-        fill_lights()
+        logging.info("OPERATOR %s", self)
+        with transaction():
+            count, elapsed = fill_lights()
+        self.report({'INFO'}, f"Created {count} channels in {elapsed * 1000:.1f} ms")
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_fill_top(Operator):
+    bl_idname = "lightdesk.fill_top"
+    bl_label = "Add strongest lights"
+    bl_description = "Create channels for the displayed lights that contribute most to the active camera's view"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return bool(context.scene.camera and peek_light_state().filtered)
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        with transaction():
+            count, elapsed = fill_top_lights(context.scene.lightdesk.fill_count)
+        self.report({'INFO'}, f"Created {count} channels in {elapsed * 1000:.1f} ms")
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_mute_weak(Operator):
+    bl_idname = "lightdesk.mute_weak"
+    bl_label = "Mute weak lights"
+    bl_description = "Mute channels whose light contributes less than the threshold, relative to the strongest light, to the active camera's view"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return bool(context.scene.camera and len(context.scene.lightdesk.channels))
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        with transaction():
+            count = mute_weak_channels(context.scene.lightdesk.mute_threshold)
+        self.report({'INFO'}, f"Muted {count} channels")
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_group_lights(Operator):
+    bl_idname = "lightdesk.group_lights"
+    bl_label = "Group lights"
+    bl_description = "Create a group channel for the lights selected in the viewport, or all displayed lights if none are selected"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    label : StringProperty(name = "Name", default = "Group")
+
+    @classmethod
+    def poll(cls, context):
+        lightdesk = context.scene.lightdesk
+        return bool(lightdesk and (peek_light_state().filtered or get_selected_objects(context)))
+
+    def invoke(self, context, event):
+        self.label = get_group_label(self.label)
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        lights = get_selected_objects(context)
+        if not lights:
+            lights = get_filtered_lights()
+        with transaction():
+            create_group(lights, self.label)
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_capture_group(Operator):
+    bl_idname = "lightdesk.capture_group"
+    bl_label = "Capture group"
+    bl_description = "Use the member lights' current power and color as the group's base values"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    channel : StringProperty()
+
+    @classmethod
+    def poll(cls, context):
+        return bool(context.scene.lightdesk)
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        index = get_channel_index(self.channel)
+        if index >= 0:
+            capture_group(context.scene.lightdesk.channels[index])
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_add_look(Operator):
+    bl_idname = "lightdesk.add_look"
+    bl_label = "Capture look"
+    bl_description = "Capture the power, color and visibility of all scene lights as a new look"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return bool(context.scene.lightdesk and peek_light_state().lights)
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        add_look(f"Look {len(context.scene.lightdesk.looks) + 1}")
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_update_look(Operator):
+    bl_idname = "lightdesk.update_look"
+    bl_label = "Update look"
+    bl_description = "Replace the selected look with the current state of all scene lights"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return get_selected_look() is not None
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        capture_look(get_selected_look())
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_recall_look(Operator):
+    bl_idname = "lightdesk.recall_look"
+    bl_label = "Recall look"
+    bl_description = "Apply the selected look to the scene lights"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return get_selected_look() is not None
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        start = time.perf_counter()
+        with transaction():
+            count = recall_look(get_selected_look())
+        self.report({'INFO'}, f"Recalled {count} lights in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_remove_look(Operator):
+    bl_idname = "lightdesk.remove_look"
+    bl_label = "Delete look"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return get_selected_look() is not None
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        lightdesk = context.scene.lightdesk
+        lightdesk.looks.remove(lightdesk.look_selected)
+        lightdesk.look_selected = min(lightdesk.look_selected, len(lightdesk.looks) - 1)
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_key_desk(Operator):
+    bl_idname = "lightdesk.key_desk"
+    bl_label = "Key desk"
+    bl_description = "Insert power, color and visibility keyframes for every channel light at the current frame"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return bool(context.scene.lightdesk and len(context.scene.lightdesk.channels))
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        start = time.perf_counter()
+        count = key_desk(context.scene.frame_current)
+        self.report({'INFO'}, f"Keyed {count} lights in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return {'FINISHED'}
+
+class LIGHTDESK_OT_crossfade(Operator):
+    bl_idname = "lightdesk.crossfade"
+    bl_label = "Crossfade to look"
+    bl_description = "Key a transition from the current lighting to the selected look, starting at the current frame"
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return get_selected_look() is not None
+
+    def execute(self, context):
+        logging.info("")
+        logging.info("OPERATOR %s", self)
+        start = time.perf_counter()
+        scene = context.scene
+        count = crossfade_look(get_selected_look(), scene.frame_current, scene.lightdesk.fade_frames)
+        self.report({'INFO'}, f"Keyed {count} lights in {(time.perf_counter() - start) * 1000:.1f} ms")
         return {'FINISHED'}
 
 class LIGHTDESK_OT_kill_channel(Operator):
@@ -508,14 +2529,14 @@ class LIGHTDESK_OT_kill_channel(Operator):
 
     def execute(self, context):
         logging.info("")
-        logging.info(f"OPERATOR {self}")
+        logging.info("OPERATOR %s", self)
         kill_channel(self.channel)
         return {'FINISHED'}
 
 class LIGHTDESK_OT_purge_channels(Operator):
     bl_idname = "lightdesk.purge_channels"
     bl_label = "Delete all channels"
-    bl_options = {'INTERNAL'}
+    bl_options = {'INTERNAL', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
@@ -523,8 +2544,10 @@ class LIGHTDESK_OT_purge_channels(Operator):
 
     def execute(self, context):
         logging.info("")
-        logging.info(f"OPERATOR {self}")
-        purge_channels()
+        logging.info("OPERATOR %s", self)
+        with transaction():
+            count, elapsed = purge_channels()
+        self.report({'INFO'}, f"Removed {count} channels in {elapsed * 1000:.1f} ms")
         return {'FINISHED'}
 
 # UI ===========================================================================
@@ -532,7 +2555,52 @@ class LIGHTDESK_OT_purge_channels(Operator):
 class LIGHTDESK_UL_lights(UIList):
 
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
-        layout.label(text = item.name)
+        if item.type == 'LIGHT':
+            layout.label(text = item.name)
+        else:
+            lights = ", ".join(light.name for light in get_instance_lights(item))
+            layout.label(text = f"{item.name}: {lights}", icon = 'OUTLINER_OB_GROUP_INSTANCE')
+
+    def filter_items(self, context, data, propname):
+        return filter_lights(getattr(data, propname), self.filter_name,
+                             self.use_filter_sort_alpha, self.bitflag_filter_item)
+
+class LIGHTDESK_UL_channels(UIList):
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        light = item.object
+        row = layout.row(align = True)
+        row.prop(item, "collapsed", icon = 'RIGHTARROW' if item.collapsed else 'DOWNARROW_HLT', icon_only = True, emboss = False)
+        row.prop(item, "solo", text = "S", toggle = True)
+        row.prop(item, "mute", text = "M", toggle = True)
+        if item.collapsed or not (light or item.is_group):
+            row.label(text = get_channel_label(item))
+        else:
+            split = row.split(factor = 0.3)
+            if item.is_group:
+                split.prop(item, "label", text = "", emboss = False)
+            else:
+                split.label(text = get_channel_label(item))
+            split = split.split(factor = 0.3, align = True)
+            if item.is_group:
+                split.prop(item, "hide_viewport", icon_only = True, emboss = False)
+                split.prop(item, "hide_render", icon_only = True, emboss = False)
+                split = split.split(factor = 0.75)
+                split.prop(item, "gain", text = "")
+                split.prop(item, "tint", text = "")
+            else:
+                split.prop(light, "hide_viewport", icon_only = True, emboss = False)
+                split.prop(light, "hide_render", icon_only = True, emboss = False)
+                split = split.split(factor = 0.75)
+                split.prop(light.data, "energy", text = "")
+                split.prop(light.data, "color", text = "")
+        op = row.operator("lightdesk.kill_channel", icon = 'PANEL_CLOSE', text = "", emboss = False)
+        op.channel = item.name
+
+class LIGHTDESK_UL_looks(UIList):
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        layout.prop(item, "name", text = "", emboss = False)
 
 class LIGHTDESK_PT_lights(Panel):
     bl_idname = 'LIGHTDESK_PT_lights'
@@ -544,28 +2612,123 @@ class LIGHTDESK_PT_lights(Panel):
 
     @classmethod
     def poll(cls, context):
-        if has_scene_changed():
-            add_timer(rebuild_ui)
-        return bpy.context.scene.lightdesk
+        return context.scene.lightdesk
 
+    @profiled
     def draw(self, context):
         lightdesk = context.scene.lightdesk
         layout = self.layout
+        if not active:
+            layout.operator("lightdesk.activate")
+            return
         if logging.getLevelName(logging.root.level) == 'DEBUG':
             row = layout.row()
             row.operator("lightdesk.debug", text="Debug")
             row.operator("lightdesk.refresh", text="Refresh")
+            row = layout.row()
+            row.prop(context.window_manager.lightdesk, "profiling", toggle = True, text = "Profile")
+            row.operator("lightdesk.dump_profile", text="Dump")
+            row = layout.row()
+            row.prop(context.window_manager.lightdesk, "throttle", toggle = True, text = "Throttle")
+            row.label(text = f"{handler_stats['processed']} run, {handler_stats['skipped']} skipped")
+        progress = get_job_progress()
+        if progress:
+            name, fraction = progress
+            layout.label(text = f"{name.replace('_', ' ').capitalize()} {fraction:.0%}", icon = 'TIME')
+        row = layout.row()
+        row.prop(lightdesk, "view", expand = True)
         row = layout.row(align = True)
         row.prop(lightdesk, "list_area", toggle = True, text = "Area" )
         row.prop(lightdesk, "list_point", toggle = True, text = "Point" )
         row.prop(lightdesk, "list_spot", toggle = True, text = "Spot" )
         row.prop(lightdesk, "list_sun", toggle = True, text = "Sun" )
+        row.prop(lightdesk, "list_instances", toggle = True, icon_only = True, icon = 'OUTLINER_OB_GROUP_INSTANCE')
         row = layout.row()
-        row.template_list("LIGHTDESK_UL_lights", "", lightdesk, "filtered", lightdesk, "selected", rows = 2, maxrows = 5, type = 'DEFAULT')
+        row.template_list("LIGHTDESK_UL_lights", "", context.scene, "objects", lightdesk, "selected", rows = 2, maxrows = 5, type = 'DEFAULT')
         row = layout.row()
         row.operator("lightdesk.assign_light", text="Add")
         row.operator("lightdesk.fill_lights", text="Fill")
         row.operator("lightdesk.purge_channels", text="Purge")
+        row.operator("lightdesk.group_lights", text="Group")
+        row = layout.row()
+        row.operator("lightdesk.key_desk", text="Key Desk", icon = 'KEY_HLT')
+
+class LIGHTDESK_PT_looks(Panel):
+    bl_idname = 'LIGHTDESK_PT_looks'
+    bl_parent_id = 'LIGHTDESK_PT_lights'
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = 'Lightdesk'
+    bl_context = 'objectmode'
+    bl_label = "Looks"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    @classmethod
+    def poll(cls, context):
+        return active
+
+    @profiled
+    def draw(self, context):
+        lightdesk = context.scene.lightdesk
+        layout = self.layout
+        row = layout.row()
+        row.template_list("LIGHTDESK_UL_looks", "", lightdesk, "looks", lightdesk, "look_selected", rows = 2, maxrows = 5, type = 'DEFAULT')
+        col = row.column(align = True)
+        col.operator("lightdesk.add_look", icon = 'ADD', text = "")
+        col.operator("lightdesk.remove_look", icon = 'REMOVE', text = "")
+        row = layout.row()
+        row.operator("lightdesk.recall_look", text = "Recall")
+        row.operator("lightdesk.update_look", text = "Update")
+        row = layout.row(align = True)
+        row.operator("lightdesk.crossfade", text = "Crossfade")
+        row.prop(lightdesk, "fade_frames", text = "Frames")
+
+class LIGHTDESK_PT_analysis(Panel):
+    bl_idname = 'LIGHTDESK_PT_analysis'
+    bl_parent_id = 'LIGHTDESK_PT_lights'
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = 'Lightdesk'
+    bl_context = 'objectmode'
+    bl_label = "Camera Contribution"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    @classmethod
+    def poll(cls, context):
+        return active
+
+    @profiled
+    def draw(self, context):
+        lightdesk = context.scene.lightdesk
+        layout = self.layout
+        if context.scene.camera is None:
+            layout.label(text = "Scene has no camera")
+            return
+        row = layout.row(align = True)
+        row.operator("lightdesk.fill_top", text = "Fill Top")
+        row.prop(lightdesk, "fill_count", text = "")
+        row = layout.row(align = True)
+        row.operator("lightdesk.mute_weak", text = "Mute Weak")
+        row.prop(lightdesk, "mute_threshold", text = "")
+
+class LIGHTDESK_PT_desk(Panel):
+    bl_idname = 'LIGHTDESK_PT_desk'
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = 'Lightdesk'
+    bl_context = 'objectmode'
+    bl_label = "Channels"
+
+    @classmethod
+    def poll(cls, context):
+        return active and context.scene.lightdesk.view == 'LIST'
+
+    @profiled
+    def draw(self, context):
+        lightdesk = context.scene.lightdesk
+        layout = self.layout
+        row = layout.row()
+        row.template_list("LIGHTDESK_UL_channels", "", lightdesk, "channels", lightdesk, "channel_selected", rows = 8, type = 'DEFAULT')
 
 class LIGHTDESK_PT_channel(Panel):
     bl_space_type = 'VIEW_3D'
@@ -578,29 +2741,55 @@ class LIGHTDESK_PT_channel(Panel):
 
     @classmethod
     def poll(cls, context):
-        return not has_scene_changed()
+        # Panels of every cached scene stay registered; show only this scene's.
+        state = desk_states.get(context.scene.as_pointer())
+        return bool(state and state.panels and cls.bl_idname in state.panels)
 
+    @profiled
     def draw_header(self, context):
-        lightdesk = bpy.context.scene.lightdesk
+        channel, light = get_panel_channel(self.bl_idname)
+        if channel is None:
+            return
         layout = self.layout
         row = layout.row()
+        sub = row.row(align = True)
+        sub.prop(channel, "solo", text = "S", toggle = True)
+        sub.prop(channel, "mute", text = "M", toggle = True)
         split = row.split(factor = 0.85)
-        split.label(text = lightdesk.channels[self.bl_idname].object.name)
+        split.label(text = get_channel_label(channel))
         op = split.operator("lightdesk.kill_channel", icon = 'PANEL_CLOSE', text = "", emboss = False)
         split = split.split()
         op.channel = str(self.bl_idname)
 
+    @profiled
     def draw(self, context):
-        lightdesk = context.scene.lightdesk
+        channel, light = get_panel_channel(self.bl_idname)
+        if channel is None:
+            return
         layout = self.layout
         row = layout.row()
+        if channel.is_group:
+            row.prop(channel, "label", text = "")
+            row = layout.row()
+            split = row.split(factor = 0.25, align = True)
+            split.prop(channel, "hide_viewport", icon_only = True, emboss = False)
+            split.prop(channel, "hide_render", icon_only = True, emboss = False)
+            split = row.split(factor = 0.85)
+            split.prop(channel, "gain", text = "")
+            split = split.split()
+            split.prop(channel, "tint", text = "")
+            op = row.operator("lightdesk.capture_group", icon = 'FILE_REFRESH', text = "", emboss = False)
+            op.channel = channel.name
+            return
+        if light is None:
+            return
         split = row.split(factor = 0.25, align = True)
-        split.prop(lightdesk.channels[self.bl_idname].object, "hide_viewport", icon_only = True, emboss = False)
-        split.prop(lightdesk.channels[self.bl_idname].object, "hide_render", icon_only = True, emboss = False)
+        split.prop(light, "hide_viewport", icon_only = True, emboss = False)
+        split.prop(light, "hide_render", icon_only = True, emboss = False)
         split = row.split(factor = 0.85)
-        split.prop(lightdesk.channels[self.bl_idname].object.data, "energy", text = "")
+        split.prop(light.data, "energy", text = "")
         split = split.split()
-        split.prop(lightdesk.channels[self.bl_idname].object.data, "color", text = "")
+        split.prop(light.data, "color", text = "")
 
 # Properties ===================================================================
 
@@ -608,48 +2797,119 @@ class LIGHTDESK_PG_object(PropertyGroup):
     name : StringProperty()
     object : PointerProperty(type = bpy.types.Object)
 
+class LIGHTDESK_PG_member(PropertyGroup):
+    name : StringProperty()
+    object : PointerProperty(type = bpy.types.Object)
+    energy : FloatProperty()
+    color : FloatVectorProperty(subtype = 'COLOR', size = 3, default = (1.0, 1.0, 1.0))
+
+class LIGHTDESK_PG_channel(PropertyGroup):
+    name : StringProperty()
+    object : PointerProperty(type = bpy.types.Object)
+    collapsed : BoolProperty(default = False)
+    is_group : BoolProperty(default = False)
+    label : StringProperty(default = "Group", update = apply_group_label)
+    members : CollectionProperty(type = LIGHTDESK_PG_member)
+    gain : FloatProperty(default = 1.0, min = 0.0, soft_max = 2.0, update = apply_group_power)
+    tint : FloatVectorProperty(subtype = 'COLOR', size = 3, default = (1.0, 1.0, 1.0), min = 0.0, soft_max = 1.0, update = apply_group_color)
+    hide_viewport : BoolProperty(default = False, update = apply_group_viewport)
+    hide_render : BoolProperty(default = False, update = apply_group_render)
+    solo : BoolProperty(default = False, update = apply_solo)
+    mute : BoolProperty(default = False, update = apply_solo)
+
+class LIGHTDESK_PG_look(PropertyGroup):
+    name : StringProperty()
+
 class LIGHTDESK_PG_scene(PropertyGroup):
-    list_area : BoolProperty(default = True, update = apply_filters)
-    list_point : BoolProperty(default = True, update = apply_filters)
-    list_spot : BoolProperty(default = True, update = apply_filters)
-    list_sun : BoolProperty(default = True, update = apply_filters)
-    lights : CollectionProperty(type = LIGHTDESK_PG_object)
-    filtered : CollectionProperty(type = LIGHTDESK_PG_object)
-    selected : IntProperty(default = -1)
-    objects : IntProperty(default = -1)
-    channels : CollectionProperty(type = LIGHTDESK_PG_object)
+    list_area : BoolProperty(default = True, update = apply_filter('AREA'))
+    list_point : BoolProperty(default = True, update = apply_filter('POINT'))
+    list_spot : BoolProperty(default = True, update = apply_filter('SPOT'))
+    list_sun : BoolProperty(default = True, update = apply_filter('SUN'))
+    list_instances : BoolProperty(default = False, update = apply_instances)
+    selected : IntProperty(default = -1, update = select_light)
+    channels : CollectionProperty(type = LIGHTDESK_PG_channel)
+    channel_selected : IntProperty(default = -1)
+    looks : CollectionProperty(type = LIGHTDESK_PG_look)
+    look_selected : IntProperty(default = -1)
+    fade_frames : IntProperty(default = 24, min = 1)
+    fill_count : IntProperty(default = 10, min = 1)
+    mute_threshold : FloatProperty(default = 0.01, min = 0.0, max = 1.0, subtype = 'FACTOR')
+    view : EnumProperty(
+        items = [('PANELS', "Panels", "Show each channel as its own panel"),
+                 ('LIST', "Desk", "Show all channels in a single scrolling list")],
+        default = 'PANELS',
+        update = apply_view,
+        )
 
 class LIGHTDESK_PG_ui(PropertyGroup):
     panels : CollectionProperty(type = LIGHTDESK_PG_object)
+    profiling : BoolProperty(default = False, update = apply_profiling)
+    throttle : BoolProperty(default = True)
 
 # Registration =================================================================
 
 
+property_classes = [
+            LIGHTDESK_PG_object,
+            LIGHTDESK_PG_member,
+            LIGHTDESK_PG_channel,
+            LIGHTDESK_PG_look,
+            LIGHTDESK_PG_scene,
+            LIGHTDESK_PG_ui,
+            ]
+
 classes = [
             LIGHTDESK_OT_debug,
+            LIGHTDESK_OT_dump_profile,
+            LIGHTDESK_OT_activate,
             LIGHTDESK_OT_refresh,
             LIGHTDESK_OT_assign_light,
             LIGHTDESK_OT_fill_lights,
+            LIGHTDESK_OT_fill_top,
+            LIGHTDESK_OT_mute_weak,
+            LIGHTDESK_OT_group_lights,
+            LIGHTDESK_OT_capture_group,
+            LIGHTDESK_OT_add_look,
+            LIGHTDESK_OT_update_look,
+            LIGHTDESK_OT_recall_look,
+            LIGHTDESK_OT_remove_look,
+            LIGHTDESK_OT_key_desk,
+            LIGHTDESK_OT_crossfade,
             LIGHTDESK_OT_kill_channel,
             LIGHTDESK_OT_purge_channels,
-            LIGHTDESK_PG_object,
-            LIGHTDESK_PG_scene,
-            LIGHTDESK_PG_ui,
             LIGHTDESK_UL_lights,
+            LIGHTDESK_UL_channels,
+            LIGHTDESK_UL_looks,
             LIGHTDESK_PT_lights,
+            LIGHTDESK_PT_looks,
+            LIGHTDESK_PT_analysis,
+            LIGHTDESK_PT_desk,
             ]
 
 def register():
+    """Register the add-on, only its data and API in background mode."""
     logging.info("register")
-    for cls in classes:
+    for cls in property_classes:
         register_class(cls)
     bpy.types.Scene.lightdesk = PointerProperty(type = LIGHTDESK_PG_scene)
     bpy.types.WindowManager.lightdesk = PointerProperty(type = LIGHTDESK_PG_ui)
-    activate()
+    if get_cli_state() and apply_cli_state not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(apply_cli_state)
+    if bpy.app.background:
+        return
+    for cls in classes:
+        register_class(cls)
+    if not is_lazy():
+        activate()
 
 def unregister():
     logging.info("unregister")
     deactivate()
-    for cls in reversed(classes):
-        unregister_class(cls)
+    if apply_cli_state in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(apply_cli_state)
+    if not bpy.app.background:
+        for cls in reversed(classes):
+            unregister_class(cls)
     del bpy.types.Scene.lightdesk
+    for cls in reversed(property_classes):
+        unregister_class(cls)
@@ -0,0 +1,221 @@
+"""Headless regression checks for Lightdesk.
+
+Replays edge cases found in review against the fake bpy, using the same
+desk setup as the benchmarks:
+
+    python benchmarks/checks.py
+
+Exits non-zero if any check fails.
+"""
+
+import logging
+import sys
+
+import fake_bpy
+from run import Desk, bpy
+
+
+def check_add_during_scan():
+    """A light added while a time-sliced scan is running ends up indexed."""
+    desk = Desk(2000)
+    addon = desk.addon
+    try:
+        addon.append_exec_queue(addon.scan_lights)
+        budget = addon.exec_budget
+        addon.exec_budget = 0.0005
+        try:
+            addon.exec_queued()
+        finally:
+            addon.exec_budget = budget
+        assert addon.is_indexing(), "scan finished in one slice"
+        new = fake_bpy.add_lights(desk.scene, 1, "Added")[0]
+        addon.depsgraph_update_post(desk.scene, fake_bpy.depsgraph(desk.scene, [fake_bpy.DepsgraphUpdate(new)]))
+        bpy.app.timers.run()
+        desk.drag()
+        bpy.app.timers.run()
+        assert new.name in addon.get_desk_state().lights, f"{new.name} not indexed"
+    finally:
+        desk.close()
+
+
+def check_draw_keeps_panels():
+    """Drawing the light list of more scenes than are cached leaves the registered panels alone."""
+    desk = Desk(4)
+    addon = desk.addon
+    try:
+        desk.filled()
+        count = len(addon.panel_classes)
+        for index in range(addon.desk_cache_size + 1):
+            scene = bpy.data.scenes.new(f"Scene{index}")
+            fake_bpy.add_lights(scene, 2, f"Scene{index}")
+            bpy.context.scene = scene
+            addon.filter_lights(scene.objects, "", False, 1)
+        bpy.context.scene = desk.scene
+        assert len(addon.panel_classes) == count, f"{count} panels became {len(addon.panel_classes)}"
+    finally:
+        desk.close()
+
+
+def check_ui_queues_nothing():
+    """Polls and the light list of a scene with no index yet register no timers."""
+    desk = Desk(4)
+    addon = desk.addon
+    try:
+        scene = bpy.data.scenes.new("Unscanned")
+        fake_bpy.add_lights(scene, 2, "Unscanned")
+        bpy.context.scene = scene
+        for cls in (addon.LIGHTDESK_OT_assign_light, addon.LIGHTDESK_OT_fill_lights, addon.LIGHTDESK_OT_fill_top,
+                    addon.LIGHTDESK_OT_group_lights, addon.LIGHTDESK_OT_add_look):
+            cls.poll(bpy.context)
+        addon.filter_lights(scene.objects, "", False, 1)
+        bpy.context.scene = desk.scene
+        assert not bpy.app.timers.functions, f"queued {list(bpy.app.timers.functions)}"
+    finally:
+        desk.close()
+
+
+def check_state_keeps_groups():
+    """Two groups survive a round trip through a desk state with their own values."""
+    desk = Desk(8)
+    addon = desk.addon
+    try:
+        channels = desk.scene.lightdesk.channels
+        names = [addon.create_group(desk.lights[:4]), addon.create_group(desk.lights[4:])]
+        groups = [channels[addon.get_channel_index(name)] for name in names]
+        assert groups[0].label != groups[1].label, f"both groups are labelled {groups[0].label}"
+        base = [group.members[0].energy for group in groups]
+        groups[0].gain, groups[1].gain = 0.5, 2.0
+        state = addon.capture_state()
+        groups[0].gain = groups[1].gain = 1.0
+        addon.apply_state(state)
+        for group, gain, energy in zip(groups, (0.5, 2.0), base):
+            light = group.members[0].object
+            assert group.gain == gain, f"{group.label} gain {group.gain}, expected {gain}"
+            assert abs(light.data.energy - energy * gain) < 1e-4, f"{light.name} energy {light.data.energy}"
+    finally:
+        desk.close()
+
+
+def check_copies_draw_own_channels():
+    """A full copy of a scene, shown in a second window, draws its own lights in panels of the same name."""
+    desk = Desk(4)
+    addon = desk.addon
+    try:
+        desk.filled()
+        channel = desk.scene.lightdesk.channels[0]
+        copy = fake_bpy.new_scene("Copy")
+        light = fake_bpy.add_lights(copy, 1, "Copy")[0]
+        addon.add_channel(channel.name, light)
+        first, second = bpy.context.window_manager.windows[:2]
+        drawn = []
+        for window in (first, second):
+            bpy.context.window, bpy.context.scene = window, window.scene
+            drawn.append(addon.get_panel_channel(channel.name)[1])
+        bpy.context.window, bpy.context.scene = first, desk.scene
+        assert drawn == [channel.object, light], f"drew {drawn}"
+    finally:
+        desk.close()
+
+
+def check_search_closes_bracket():
+    """Closing a bracket in the light search matches lights the unclosed pattern didn't."""
+    desk = Desk(0)
+    addon = desk.addon
+    try:
+        light = fake_bpy.add_lights(desk.scene, 1, "ab")[0]
+        addon.update_lights()
+        objects = desk.scene.objects
+        index = objects.keys().index(light.name)
+        addon.filter_lights(objects, "a[b", False, 1)
+        flags, order = addon.filter_lights(objects, "a[b]", False, 1)
+        assert flags[index], f"{light.name} not matched by a[b]"
+    finally:
+        desk.close()
+
+
+def check_group_writes_after_rename():
+    """Group faders still write their own members after renames re-sort bpy.data."""
+    desk = Desk(8)
+    addon = desk.addon
+    try:
+        other = bpy.data.objects.new("Other")
+        members = desk.lights[2:5]
+        group = desk.scene.lightdesk.channels[addon.get_channel_index(addon.create_group(members))]
+        group.gain = 1.0
+        group.hide_viewport = False
+        fake_bpy.rename(other, "A")
+        group.hide_viewport = True
+        hidden = [light.name for light in desk.lights if light.hide_viewport]
+        assert hidden == [light.name for light in members], f"hid {hidden}"
+        fake_bpy.rename(members[0].data, "Z")
+        group.gain = 0.5
+        dimmed = [light.name for light in desk.lights if light.data.energy != 10.0]
+        assert dimmed == [light.name for light in members], f"dimmed {dimmed}"
+    finally:
+        desk.close()
+
+
+def check_selection_survives_removal():
+    """Removing a light before the selected one keeps the same light selected for Add."""
+    desk = Desk(6)
+    addon = desk.addon
+    try:
+        objects = desk.scene.objects
+        addon.filter_lights(objects, "", False, 1)
+        desk.scene.lightdesk.selected = objects.find("Light.003")
+        bpy.data.objects.remove(desk.lights[0])
+        addon.depsgraph_update_post(desk.scene, fake_bpy.depsgraph(desk.scene, []))
+        bpy.app.timers.run()
+        selected = [light.name for light in addon.get_selected_lights()]
+        assert selected == ["Light.003"], f"selected {selected}"
+        objects = desk.scene.objects
+        assert objects[desk.scene.lightdesk.selected].name == "Light.003", "list highlights another light"
+    finally:
+        desk.close()
+
+
+def check_unsoloed_channel_delete():
+    """Deleting a channel while another is soloed gives its light back its own visibility."""
+    desk = Desk(4)
+    addon = desk.addon
+    try:
+        desk.filled()
+        channels = desk.scene.lightdesk.channels
+        channels[0].solo = True
+        light = channels[1].object
+        assert light.hide_viewport, f"{light.name} not hidden by the solo"
+        addon.kill_channel(channels[1].name)
+        assert not light.hide_viewport and not light.hide_render, f"{light.name} still hidden"
+    finally:
+        desk.close()
+
+
+checks = [
+    check_add_during_scan,
+    check_draw_keeps_panels,
+    check_ui_queues_nothing,
+    check_state_keeps_groups,
+    check_copies_draw_own_channels,
+    check_search_closes_bracket,
+    check_group_writes_after_rename,
+    check_selection_survives_removal,
+    check_unsoloed_channel_delete,
+]
+
+
+def main():
+    logging.getLogger().setLevel(logging.ERROR)
+    failed = 0
+    for check in checks:
+        try:
+            check()
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {check.__name__}: {e}")
+        else:
+            print(f"ok   {check.__name__}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,928 @@
+"""Lightweight stand-in for the parts of bpy that Lightdesk touches.
+
+Only enough of the Blender Python API is modelled to drive the add-on's module
+level functions headlessly: ID datablocks, RNA-like collections, property
+groups declared through annotations, class registration, timers and handlers.
+Nothing here draws or evaluates anything.
+
+    import fake_bpy
+    bpy = fake_bpy.install()        # inserts bpy into sys.modules
+    scene = fake_bpy.new_scene("Scene")
+    fake_bpy.add_lights(scene, 100)
+"""
+
+import sys
+import types as _types
+
+
+# Properties -------------------------------------------------------------------
+
+class _Property:
+    """Property definition that doubles as a data descriptor once registered."""
+
+    def __init__(self, kind, default = None, update = None, type = None, items = None, size = None, **kwargs):
+        self.kind = kind
+        self.default = default
+        self.update = update
+        self.type = type
+        self.items = items
+        self.size = size
+
+    def initial(self):
+        if self.kind == 'COLLECTION':
+            return Collection_(self.type)
+        if self.kind == 'POINTER':
+            if self.type is not None and issubclass(self.type, PropertyGroup):
+                return self.type()
+            return None
+        if self.kind == 'ENUM':
+            if self.default is not None:
+                return self.default
+            items = self.items(None, None) if callable(self.items) else self.items
+            return items[0][0] if items else ''
+        if self.kind == 'FLOAT_VECTOR':
+            if self.default is not None:
+                return list(self.default)
+            return [0.0] * (self.size or 3)
+        if self.default is not None:
+            return self.default
+        return {'BOOL': False, 'INT': 0, 'FLOAT': 0.0, 'STRING': ''}.get(self.kind)
+
+    def _store(self, instance):
+        store = instance.__dict__.get('_rna')
+        if store is None:
+            store = instance.__dict__['_rna'] = {}
+        return store
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        store = self._store(instance)
+        key = id(self)
+        if key not in store:
+            store[key] = self.initial()
+        return store[key]
+
+    def __set__(self, instance, value):
+        if self.kind in ('COLLECTION',):
+            raise AttributeError("collection properties are read-only")
+        if self.kind == 'FLOAT_VECTOR':
+            value = list(value)
+        self._store(instance)[id(self)] = value
+        if self.update is not None:
+            self.update(instance, context)
+
+
+def _prop(kind):
+    def factory(**kwargs):
+        return _Property(kind, **kwargs)
+    factory.__name__ = kind.title() + "Property"
+    return factory
+
+
+# Collections ------------------------------------------------------------------
+
+class Collection_:
+    """bpy_prop_collection stand-in holding property groups or IDs."""
+
+    def __init__(self, type = None, items = None):
+        self.type = type
+        self._items = items if items is not None else []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __reversed__(self):
+        return reversed(list(self._items))
+
+    def __bool__(self):
+        return True
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for item in self._items:
+                if item.name == key:
+                    return item
+            raise KeyError(key)
+        if isinstance(key, slice):
+            return self._items[key]
+        return self._items[key]
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            return self.find(key) >= 0
+        return key in self._items
+
+    def add(self):
+        item = self.type()
+        self._items.append(item)
+        return item
+
+    def remove(self, index):
+        if isinstance(index, int):
+            del self._items[index]
+        else:
+            self._items.remove(index)
+
+    def clear(self):
+        self._items.clear()
+
+    def move(self, source, target):
+        self._items.insert(target, self._items.pop(source))
+
+    def find(self, name):
+        for index, item in enumerate(self._items):
+            if item.name == name:
+                return index
+        return -1
+
+    def get(self, name, default = None):
+        index = self.find(name)
+        return self._items[index] if index >= 0 else default
+
+    def keys(self):
+        return [item.name for item in self._items]
+
+    def values(self):
+        return list(self._items)
+
+    def items(self):
+        return [(item.name, item) for item in self._items]
+
+    def foreach_get(self, attr, seq):
+        index = 0
+        for item in self._items:
+            value = getattr(item, attr)
+            if isinstance(value, (list, tuple, Matrix)):
+                for element in _flatten(value):
+                    seq[index] = element
+                    index += 1
+            else:
+                seq[index] = value
+                index += 1
+        if index != len(seq):
+            raise RuntimeError(f"foreach_get: sequence size mismatch for {attr}")
+
+    def foreach_set(self, attr, seq):
+        if not self._items:
+            return
+        sample = getattr(self._items[0], attr)
+        width = len(list(_flatten(sample))) if isinstance(sample, (list, tuple, Matrix)) else 1
+        if len(seq) != width * len(self._items):
+            raise RuntimeError(f"foreach_set: sequence size mismatch for {attr}")
+        for index, item in enumerate(self._items):
+            if width == 1:
+                value = seq[index]
+                setattr(item, attr, type(sample)(value))
+            else:
+                values = [float(value) for value in seq[index * width:(index + 1) * width]]
+                if isinstance(sample, Matrix):
+                    sample.set_flat(values)
+                else:
+                    setattr(item, attr, values)
+
+
+def _flatten(value):
+    if isinstance(value, Matrix):
+        return value.flat()
+    return value
+
+
+class IDCollection(Collection_):
+    """bpy.data.<collection> stand-in with new() and remove()."""
+
+    def __init__(self, factory):
+        super().__init__(None)
+        self.factory = factory
+        self._counters = {}
+
+    def new(self, name, *args, **kwargs):
+        item = self.factory(self._unique_name(name), *args, **kwargs)
+        self._items.append(item)
+        return item
+
+    def remove(self, item, do_unlink = True):
+        self._items.remove(item)
+        if do_unlink:
+            _unlink_id(item)
+
+    def _unique_name(self, name):
+        # Names handed out here are unique; renames are the caller's problem.
+        index = self._counters.get(name)
+        self._counters[name] = (index or 0) + 1
+        if index is None:
+            return name
+        return f"{name}.{index:03d}"
+
+
+# Datablocks -------------------------------------------------------------------
+
+class bpy_struct:
+    def as_pointer(self):
+        return id(self)
+
+    def __getitem__(self, key):
+        prop = _find_property(type(self), key)
+        if prop is not None:
+            return prop.__get__(self, type(self))
+        return self.__dict__.setdefault('_idprops', {})[key]
+
+    def __setitem__(self, key, value):
+        # Registered properties are ID properties too; writing the item skips update.
+        prop = _find_property(type(self), key)
+        if prop is not None:
+            prop._store(self)[id(prop)] = list(value) if prop.kind == 'FLOAT_VECTOR' else value
+            return
+        self.__dict__.setdefault('_idprops', {})[key] = value
+
+    def __contains__(self, key):
+        return key in self.__dict__.get('_idprops', {})
+
+    def __delitem__(self, key):
+        del self.__dict__.get('_idprops', {})[key]
+
+    def get(self, key, default = None):
+        return self.__dict__.get('_idprops', {}).get(key, default)
+
+    def keys(self):
+        return list(self.__dict__.get('_idprops', {}).keys())
+
+
+def _find_property(cls, name):
+    value = getattr(cls, name, None)
+    return value if isinstance(value, _Property) else None
+
+
+class PropertyGroup(bpy_struct):
+    pass
+
+
+class ID(bpy_struct):
+    _session_uid = 0
+
+    def __init__(self, name):
+        ID._session_uid += 1
+        self.name = name
+        self.session_uid = ID._session_uid
+        self.animation_data = None
+        self.library = None
+        self.users = 1
+        self.tagged = 0
+
+    @property
+    def original(self):
+        return self
+
+    def update_tag(self, refresh = set()):
+        self.tagged += 1
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimData()
+        return self.animation_data
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+class Matrix:
+    """4x4 matrix stored row-major; only translation and flat access."""
+
+    def __init__(self, translation = (0.0, 0.0, 0.0)):
+        self.rows = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+        self.translation = translation
+
+    @property
+    def translation(self):
+        return [self.rows[0][3], self.rows[1][3], self.rows[2][3]]
+
+    @translation.setter
+    def translation(self, value):
+        for axis in range(3):
+            self.rows[axis][3] = float(value[axis])
+
+    def flat(self):
+        # foreach_get on matrices is column-major, like Blender.
+        return [self.rows[row][column] for column in range(4) for row in range(4)]
+
+    def set_flat(self, values):
+        for column in range(4):
+            for row in range(4):
+                self.rows[row][column] = values[column * 4 + row]
+
+    def __len__(self):
+        return 16
+
+
+class Light(ID):
+    def __init__(self, name, type = 'POINT'):
+        super().__init__(name)
+        self.type = type
+        self.energy = 10.0
+        self.color = [1.0, 1.0, 1.0]
+        self.spot_size = 0.785398
+        self.size = 0.25
+        self.shadow_soft_size = 0.25
+
+
+class Object(ID):
+    def __init__(self, name, data = None):
+        super().__init__(name)
+        self.data = data
+        self.type = 'LIGHT' if isinstance(data, Light) else ('CAMERA' if isinstance(data, Camera) else ('EMPTY' if data is None else 'MESH'))
+        self.hide_viewport = False
+        self.hide_render = False
+        self.matrix_world = Matrix()
+        self.instance_type = 'NONE'
+        self.instance_collection = None
+        self.users_collection = []
+        self._selected = False
+
+    def select_get(self):
+        return self._selected
+
+    def select_set(self, state):
+        self._selected = state
+
+
+class Camera(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.angle = 0.8575
+        self.clip_end = 1000.0
+        self.sensor_fit = 'AUTO'
+
+
+class Mesh(ID):
+    pass
+
+
+class Collection(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = _LinkCollection(self)
+        self.children = _LinkCollection(self)
+
+    @property
+    def all_objects(self):
+        seen = {}
+        for obj in self.objects:
+            seen[id(obj)] = obj
+        for child in self.children:
+            for obj in child.all_objects:
+                seen.setdefault(id(obj), obj)
+        return Collection_(None, list(seen.values()))
+
+
+class _LinkCollection(Collection_):
+    def __init__(self, owner):
+        super().__init__(None)
+        self.owner = owner
+
+    def link(self, item):
+        self._items.append(item)
+        if isinstance(item, Object):
+            item.users_collection.append(self.owner)
+        _invalidate_scenes()
+
+    def unlink(self, item):
+        self._items.remove(item)
+        if isinstance(item, Object) and self.owner in item.users_collection:
+            item.users_collection.remove(self.owner)
+        _invalidate_scenes()
+
+
+class Scene(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.collection = Collection(f"{name} Collection")
+        self.frame_current = 1
+        self.frame_start = 1
+        self.frame_end = 250
+        self.camera = None
+        self._objects = None
+        self.view_layers = Collection_(None, [ViewLayer(self)])
+
+    @property
+    def objects(self):
+        if self._objects is None:
+            self._objects = Collection_(None, list(self.collection.all_objects))
+        return self._objects
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+
+
+class ViewLayer(bpy_struct):
+    def __init__(self, scene):
+        self.scene = scene
+        self.name = "ViewLayer"
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+    @property
+    def objects(self):
+        return self.scene.objects
+
+
+class Action(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.fcurves = _FCurves()
+
+
+class AnimData(bpy_struct):
+    def __init__(self):
+        self.action = None
+
+
+class _FCurves(Collection_):
+    def new(self, data_path, index = 0, action_group = ""):
+        if self.find_curve(data_path, index):
+            raise RuntimeError(f"F-Curve {data_path}[{index}] already exists")
+        curve = FCurve(data_path, index)
+        self._items.append(curve)
+        return curve
+
+    def find_curve(self, data_path, index = 0):
+        for curve in self._items:
+            if curve.data_path == data_path and curve.array_index == index:
+                return curve
+        return None
+
+    def find(self, data_path, index = 0):
+        return self.find_curve(data_path, index)
+
+
+class Keyframe(bpy_struct):
+    def __init__(self):
+        self.co = [0.0, 0.0]
+        self.interpolation = 'BEZIER'
+
+
+class _Keyframes(Collection_):
+    def __init__(self):
+        super().__init__(Keyframe)
+
+    def add(self, count = 1):
+        for _ in range(count):
+            self._items.append(Keyframe())
+
+    def insert(self, frame, value, options = set()):
+        key = Keyframe()
+        key.co = [frame, value]
+        self._items.append(key)
+        return key
+
+
+class FCurve(bpy_struct):
+    def __init__(self, data_path, index):
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = _Keyframes()
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+        self.keyframe_points._items.sort(key = lambda key: key.co[0])
+
+
+class WindowManager(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.windows = Collection_(None, [])
+
+
+class Screen(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.is_animation_playing = False
+        self.areas = Collection_(None, [Area()])
+
+
+class Area(bpy_struct):
+    def __init__(self):
+        self.type = 'VIEW_3D'
+        self.regions = Collection_(None, [Region()])
+
+
+class Region(bpy_struct):
+    def __init__(self):
+        self.type = 'UI'
+        self.redraws = 0
+
+    def tag_redraw(self):
+        self.redraws += 1
+
+
+class Window(bpy_struct):
+    def __init__(self, scene):
+        self.scene = scene
+        self.screen = Screen("Layout")
+        self.view_layer = scene.view_layers[0]
+
+
+class DepsgraphUpdate:
+    def __init__(self, id, transform = False, geometry = False, shading = False):
+        self.id = id
+        self.is_updated_transform = transform
+        self.is_updated_geometry = geometry
+        self.is_updated_shading = shading
+
+
+class DepsgraphObjectInstance:
+    def __init__(self, object, parent = None, matrix = None):
+        self.object = object
+        self.parent = parent
+        self.is_instance = parent is not None
+        self.instance_object = object
+        self.matrix_world = matrix or Matrix()
+
+
+class Depsgraph(bpy_struct):
+    def __init__(self, scene, updates = ()):
+        self.scene = scene
+        self.scene_eval = scene
+        self.view_layer = scene.view_layers[0]
+        self.updates = list(updates)
+
+    def id_type_updated(self, id_type):
+        return any(type(update.id).__name__.upper() == id_type for update in self.updates)
+
+    @property
+    def object_instances(self):
+        for obj in self.scene.objects:
+            yield DepsgraphObjectInstance(obj)
+            if obj.instance_type == 'COLLECTION' and obj.instance_collection:
+                for source in obj.instance_collection.all_objects:
+                    yield DepsgraphObjectInstance(source, obj)
+
+
+# Registration -----------------------------------------------------------------
+
+class Panel(bpy_struct):
+    bl_options = set()
+
+    def __init__(self):
+        self.layout = Layout()
+
+
+class Operator(bpy_struct):
+    bl_options = set()
+
+    def __init__(self):
+        self.reports = []
+        self.layout = Layout()
+
+    def report(self, type, message):
+        self.reports.append((type, message))
+
+
+class UIList(bpy_struct):
+    bitflag_filter_item = 1 << 30
+
+    def __init__(self):
+        self.filter_name = ""
+        self.use_filter_invert = False
+        self.use_filter_sort_alpha = False
+        self.use_filter_sort_reverse = False
+        self.layout_type = 'DEFAULT'
+
+
+class Menu(bpy_struct):
+    pass
+
+
+class AddonPreferences(bpy_struct):
+    pass
+
+
+class Layout:
+    """Accepts any layout call and counts them."""
+
+    calls = 0
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            Layout.calls += 1
+            return Layout()
+        return call
+
+    def __setattr__(self, name, value):
+        pass
+
+
+registered = {}
+
+
+def _registration_key(cls):
+    name = getattr(cls, 'bl_idname', None) or cls.__name__
+    if issubclass(cls, (Panel, Menu, UIList)) and '.' not in name:
+        return name
+    return cls.__name__
+
+
+def register_class(cls):
+    key = _registration_key(cls)
+    if key in registered:
+        raise ValueError(f"register_class(...): already registered as a subclass '{key}'")
+    for klass in reversed(cls.__mro__):
+        for attr, value in getattr(klass, '__annotations__', {}).items():
+            if isinstance(value, _Property):
+                setattr(cls, attr, value)
+    registered[key] = cls
+    setattr(types, key, cls)
+
+
+def unregister_class(cls):
+    key = _registration_key(cls)
+    if registered.get(key) is cls:
+        del registered[key]
+        if getattr(types, key, None) is cls:
+            delattr(types, key)
+        return
+    raise RuntimeError(f"unregister_class(...): missing bl_rna attribute from '{cls.__name__}'")
+
+
+# Timers and handlers ----------------------------------------------------------
+
+class _Timers:
+    def __init__(self):
+        self.functions = {}
+
+    def register(self, function, first_interval = 0, persistent = False):
+        self.functions[function] = first_interval
+
+    def unregister(self, function):
+        if function not in self.functions:
+            raise ValueError("Error: function is not registered")
+        del self.functions[function]
+
+    def is_registered(self, function):
+        return function in self.functions
+
+    def run(self, limit = 1000):
+        """Fire every registered timer once per tick until none remain due."""
+        ticks = 0
+        while self.functions and ticks < limit:
+            ticks += 1
+            for function in list(self.functions):
+                if function not in self.functions:
+                    continue
+                interval = function()
+                if interval is None:
+                    self.functions.pop(function, None)
+                elif function in self.functions:
+                    self.functions[function] = interval
+            if all(interval and interval >= 1.0 for interval in self.functions.values()):
+                break
+        return ticks
+
+
+def persistent(function):
+    function._bpy_persistent = True
+    return function
+
+
+class _Handlers:
+    names = ('load_pre', 'load_post', 'depsgraph_update_pre', 'depsgraph_update_post',
+             'undo_pre', 'undo_post', 'redo_pre', 'redo_post', 'frame_change_pre',
+             'frame_change_post', 'render_init', 'render_pre', 'render_post',
+             'render_complete', 'render_cancel', 'save_pre', 'save_post')
+
+    def __init__(self):
+        for name in self.names:
+            setattr(self, name, [])
+        self.persistent = persistent
+
+
+class _MsgBus:
+    def __init__(self):
+        self.subscriptions = []
+
+    def subscribe_rna(self, key, owner, args, notify, options = set()):
+        self.subscriptions.append((key, owner, args, notify))
+
+    def clear_by_owner(self, owner):
+        self.subscriptions = [entry for entry in self.subscriptions if entry[1] is not owner]
+
+    def publish_rna(self, key):
+        for entry_key, owner, args, notify in list(self.subscriptions):
+            if entry_key == key:
+                notify(*args)
+
+
+class _Ops:
+    class ed:
+        undo_pushes = []
+
+        @staticmethod
+        def undo_push(message = ""):
+            _Ops.ed.undo_pushes.append(message)
+            return {'FINISHED'}
+
+
+# Module assembly --------------------------------------------------------------
+
+class _Context:
+    def __init__(self):
+        self.window_manager = None
+        self.window = None
+        self.scene = None
+        self.object = None
+        self.selected_objects = []
+        self.area = None
+        self.region = None
+
+    @property
+    def screen(self):
+        return self.window.screen if self.window else None
+
+    @property
+    def view_layer(self):
+        return self.scene.view_layers[0]
+
+    def evaluated_depsgraph_get(self):
+        return Depsgraph(self.scene)
+
+
+class _Data:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.scenes = IDCollection(Scene)
+        self.objects = IDCollection(Object)
+        self.lights = IDCollection(Light)
+        self.cameras = IDCollection(Camera)
+        self.collections = IDCollection(Collection)
+        self.actions = IDCollection(Action)
+        self.window_managers = IDCollection(WindowManager)
+        self.filepath = ""
+
+
+context = _Context()
+data = _Data()
+types = _types.ModuleType("bpy.types")
+props = _types.ModuleType("bpy.props")
+utils = _types.ModuleType("bpy.utils")
+app = _types.ModuleType("bpy.app")
+msgbus = _MsgBus()
+ops = _Ops()
+
+
+def _invalidate_scenes():
+    for scene in data.scenes:
+        scene._objects = None
+
+
+def _unlink_id(item):
+    if isinstance(item, Object):
+        for collection in list(item.users_collection):
+            collection.objects.unlink(item)
+        for scene in data.scenes:
+            for prop_owner in _property_owners(scene):
+                _clear_pointers(prop_owner, item)
+
+
+def _property_owners(owner):
+    return [owner]
+
+
+def _clear_pointers(owner, item, depth = 0):
+    """Null out pointer properties referencing a removed ID, like Blender does."""
+    if depth > 4:
+        return
+    store = owner.__dict__.get('_rna', {})
+    for key, value in list(store.items()):
+        if value is item:
+            store[key] = None
+        elif isinstance(value, Collection_):
+            for element in value._items:
+                _clear_pointers(element, item, depth + 1)
+        elif isinstance(value, PropertyGroup):
+            _clear_pointers(value, item, depth + 1)
+
+
+def _build():
+    for name, kind in (("BoolProperty", 'BOOL'), ("IntProperty", 'INT'), ("FloatProperty", 'FLOAT'),
+                       ("StringProperty", 'STRING'), ("EnumProperty", 'ENUM'),
+                       ("FloatVectorProperty", 'FLOAT_VECTOR'), ("PointerProperty", 'POINTER'),
+                       ("CollectionProperty", 'COLLECTION'), ("IntVectorProperty", 'FLOAT_VECTOR'),
+                       ("BoolVectorProperty", 'FLOAT_VECTOR')):
+        setattr(props, name, _prop(kind))
+    for cls in (bpy_struct, PropertyGroup, ID, Light, Object, Camera, Mesh, Collection, Scene, ViewLayer,
+                Action, AnimData, FCurve, Keyframe, WindowManager, Screen, Area, Region, Window,
+                Depsgraph, Panel, Operator, UIList, Menu, AddonPreferences):
+        setattr(types, cls.__name__, cls)
+    types.SpotLight = types.PointLight = types.SunLight = types.AreaLight = Light
+    utils.register_class = register_class
+    utils.unregister_class = unregister_class
+    app.timers = _Timers()
+    app.handlers = _Handlers()
+    app.background = False
+    app.version = (3, 6, 0)
+    app.version_string = "3.6.0"
+    app.binary_path = "blender"
+    app.is_job_running = lambda job_type: False
+    handlers_module = _types.ModuleType("bpy.app.handlers")
+    handlers_module.persistent = persistent
+
+
+def install():
+    """Insert the fake bpy into sys.modules and return it."""
+    module = sys.modules[__name__]
+    bpy = _types.ModuleType("bpy")
+    bpy.types = types
+    bpy.props = props
+    bpy.utils = utils
+    bpy.app = app
+    bpy.context = context
+    bpy.data = data
+    bpy.msgbus = msgbus
+    bpy.ops = ops
+    handlers_module = _types.ModuleType("bpy.app.handlers")
+    handlers_module.persistent = persistent
+    app_module = app
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.types"] = types
+    sys.modules["bpy.props"] = props
+    sys.modules["bpy.utils"] = utils
+    sys.modules["bpy.app"] = app_module
+    sys.modules["bpy.app.handlers"] = handlers_module
+    for name in dir(app.handlers):
+        if not name.startswith('_'):
+            setattr(handlers_module, name, getattr(app.handlers, name))
+    return bpy
+
+
+def reset():
+    """Drop all datablocks, registrations, timers and handlers."""
+    data.reset()
+    registered.clear()
+    app.timers.functions.clear()
+    for name in _Handlers.names:
+        getattr(app.handlers, name).clear()
+    msgbus.subscriptions.clear()
+    _Ops.ed.undo_pushes.clear()
+    context.scene = None
+    context.object = None
+    context.window = None
+    context.selected_objects = []
+    context.window_manager = data.window_managers.new("WinMan")
+
+
+def new_scene(name = "Scene"):
+    """Create a scene with one window showing it and make it current."""
+    scene = data.scenes.new(name)
+    if context.window_manager is None:
+        context.window_manager = data.window_managers.new("WinMan")
+    window = Window(scene)
+    context.window_manager.windows._items.append(window)
+    context.window = window
+    context.scene = scene
+    return scene
+
+
+LIGHT_TYPES = ('AREA', 'POINT', 'SPOT', 'SUN')
+
+
+def add_lights(scene, count, prefix = "Light", collection = None):
+    """Link `count` lights of rotating types into the scene and return them."""
+    collection = collection or scene.collection
+    lights = []
+    for index in range(count):
+        light_data = data.lights.new(f"{prefix}", LIGHT_TYPES[index % len(LIGHT_TYPES)])
+        light = data.objects.new(f"{prefix}", light_data)
+        light.matrix_world.translation = (float(index % 17), float(index % 13), float(index % 7) + 1.0)
+        collection.objects.link(light)
+        lights.append(light)
+    return lights
+
+
+def add_camera(scene, name = "Camera"):
+    camera = data.objects.new(name, data.cameras.new(name))
+    camera.matrix_world.translation = (0.0, -20.0, 5.0)
+    scene.collection.objects.link(camera)
+    scene.camera = camera
+    return camera
+
+
+def rename(item, name):
+    """Rename an ID and re-sort its bpy.data collection by name, as Blender does."""
+    item.name = name
+    for collection in vars(data).values():
+        if isinstance(collection, IDCollection) and item in collection._items:
+            collection._items.sort(key = lambda other: other.name)
+
+
+def depsgraph(scene = None, updates = ()):
+    return Depsgraph(scene or context.scene, updates)
+
+
+_build()
@@ -0,0 +1,261 @@
+"""Headless scaling benchmarks for Lightdesk.
+
+Drives the add-on's module level functions against the fake bpy in this
+directory, at increasing light counts, and reports time and allocations per
+operation:
+
+    python benchmarks/run.py
+    python benchmarks/run.py --sizes 100 1000 --repeat 5 --json before.json
+    python benchmarks/run.py --compare before.json
+
+Timings come from a plain run of each operation; allocations are measured in
+a separate tracemalloc run so they don't skew the timings.
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ADDON = os.path.join(os.path.dirname(HERE), "__init__.py")
+sys.path.insert(0, HERE)
+
+import fake_bpy
+
+bpy = fake_bpy.install()
+
+
+def load_addon():
+    """Import a fresh copy of the add-on so no state leaks between sizes."""
+    spec = importlib.util.spec_from_file_location("lightdesk", ADDON)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["lightdesk"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def setup_scene(size):
+    fake_bpy.reset()
+    scene = fake_bpy.new_scene("Scene")
+    lights = fake_bpy.add_lights(scene, size)
+    fake_bpy.add_camera(scene)
+    return scene, lights
+
+
+class Desk:
+    """One scene of `size` lights with the add-on registered and settled.
+
+    With `background` set, registers as under `blender -b`.
+    """
+
+    def __init__(self, size, background = False):
+        self.scene, self.lights = setup_scene(size)
+        self.addon = load_addon()
+        bpy.app.background = background
+        start = time.perf_counter()
+        self.addon.register()
+        bpy.app.timers.run()
+        self.register_time = time.perf_counter() - start
+        # Throttling is measured by its own cases; the rest time every call.
+        bpy.context.window_manager.lightdesk.throttle = False
+        self.added = 0
+        self.other = None
+
+    def close(self):
+        self.addon.unregister()
+        bpy.app.timers.run()
+        bpy.app.background = False
+
+    # Setup steps, excluded from timings.
+
+    def filled(self):
+        if not len(self.scene.lightdesk.channels):
+            self.addon.fill_lights()
+
+    def purged(self):
+        if len(self.scene.lightdesk.channels):
+            self.addon.purge_channels()
+
+    def second_scene(self):
+        if self.other is None:
+            self.other = fake_bpy.new_scene("Other")
+            fake_bpy.add_lights(self.other, len(self.lights), "Other")
+            self.switch_to(self.other)
+            self.filled()
+            self.switch_to(self.scene)
+        self.filled()
+
+    def new_light(self):
+        self.added += 1
+        self.pending = fake_bpy.add_lights(self.scene, 1, f"Added{self.added}")[0]
+
+    # Operations.
+
+    def drag(self):
+        light = self.lights[len(self.lights) // 2]
+        update = fake_bpy.DepsgraphUpdate(light, transform = True)
+        self.addon.depsgraph_update_post(self.scene, fake_bpy.depsgraph(self.scene, [update]))
+
+    def throttled(self, operation, playing = False):
+        """Run operation ten times with the handler throttled, as during a drag or playback."""
+        def run():
+            bpy.context.window_manager.lightdesk.throttle = True
+            bpy.context.window.screen.is_animation_playing = playing
+            try:
+                for _ in range(10):
+                    operation()
+            finally:
+                bpy.context.window.screen.is_animation_playing = False
+                bpy.context.window_manager.lightdesk.throttle = False
+        return run
+
+    def add(self):
+        update = fake_bpy.DepsgraphUpdate(self.pending)
+        self.addon.depsgraph_update_post(self.scene, fake_bpy.depsgraph(self.scene, [update]))
+
+    def redraw(self):
+        """Poll and draw every channel panel, as a sidebar redraw does."""
+        for panel_class in list(self.addon.panel_classes.values()):
+            if panel_class.poll(bpy.context):
+                panel = panel_class()
+                panel.draw_header(bpy.context)
+                panel.draw(bpy.context)
+
+    def switch_to(self, scene):
+        bpy.context.scene = bpy.context.window.scene = scene
+        self.addon.depsgraph_update_post(scene, fake_bpy.depsgraph(scene, []))
+        bpy.app.timers.run()
+
+    def two_windows(self):
+        """Show the second scene in a window of its own beside the first."""
+        self.second_scene()
+        first, second = bpy.context.window_manager.windows[:2]
+        first.scene, second.scene = self.scene, self.other
+        bpy.context.window, bpy.context.scene = first, self.scene
+        self.addon.depsgraph_update_post(self.scene, fake_bpy.depsgraph(self.scene, []))
+        bpy.app.timers.run()
+
+    def alternate(self):
+        """Update and redraw from each window in turn, as when working across both."""
+        for window in bpy.context.window_manager.windows[:2]:
+            bpy.context.window, bpy.context.scene = window, window.scene
+            self.addon.depsgraph_update_post(window.scene, fake_bpy.depsgraph(window.scene, []))
+            self.redraw()
+            bpy.app.timers.run()
+        bpy.context.window, bpy.context.scene = bpy.context.window_manager.windows[0], self.scene
+
+    def switch(self):
+        """Switch to the second scene and back."""
+        self.switch_to(self.other)
+        self.switch_to(self.scene)
+
+
+def operations(desk):
+    """(name, setup, operation) for every benchmarked path."""
+    addon = desk.addon
+    return [
+        ("update_lights", None, addon.update_lights),
+        ("update_filtered", None, addon.update_filtered),
+        ("fill_lights", desk.purged, addon.fill_lights),
+        ("purge_channels", desk.filled, addon.purge_channels),
+        ("rebuild_ui", desk.filled, addon.rebuild_ui),
+        ("deadhead_channels", desk.filled, addon.deadhead_channels),
+        ("redraw_channels", desk.filled, desk.redraw),
+        ("key_desk", desk.filled, lambda: addon.key_desk(1)),
+        ("depsgraph_update_post:drag", desk.filled, desk.drag),
+        ("depsgraph_update_post:add", desk.new_light, desk.add),
+        ("depsgraph_update_post:throttle", desk.filled, desk.throttled(desk.drag)),
+        ("depsgraph_update_post:playback", desk.filled, desk.throttled(desk.drag, playing = True)),
+        ("switch_scene", desk.second_scene, desk.switch),
+        ("two_windows", desk.two_windows, desk.alternate),
+    ]
+
+
+def measure(setup, operation, repeat):
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+        bpy.app.timers.run()
+    if setup:
+        setup()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    operation()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    bpy.app.timers.run()
+    return {"min": min(timings),
+            "median": statistics.median(timings),
+            "peak_kib": (peak - before) / 1024,
+            "net_kib": (current - before) / 1024}
+
+
+def single(elapsed):
+    return {"min": elapsed, "median": elapsed, "peak_kib": 0.0, "net_kib": 0.0}
+
+
+def run(sizes, repeat, only = None):
+    results = {}
+    for size in sizes:
+        background = Desk(size, background = True)
+        background.close()
+        desk = Desk(size)
+        results[size] = {"register": single(desk.register_time),
+                         "register:background": single(background.register_time)}
+        for name, setup, operation in operations(desk):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            results[size][name] = measure(setup, operation, repeat)
+        desk.close()
+    return results
+
+
+def report(results, baseline = None):
+    header = f"{'operation':<32} {'lights':>7} {'min ms':>10} {'median ms':>10} {'peak KiB':>10} {'net KiB':>9}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    for size, operations in results.items():
+        for name, stats in operations.items():
+            line = (f"{name:<32} {size:>7} {stats['min'] * 1000:>10.3f} {stats['median'] * 1000:>10.3f} "
+                    f"{stats['peak_kib']:>10.1f} {stats['net_kib']:>9.1f}")
+            if baseline:
+                base = baseline.get(str(size), {}).get(name)
+                line += f" {stats['median'] / base['median']:>7.2f}x" if base and base['median'] else f" {'-':>8}"
+            print(line)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--only", nargs = "+", help = "only run operations whose name contains one of these")
+    parser.add_argument("--json", help = "write results to this file")
+    parser.add_argument("--compare", help = "show the ratio against results saved with --json")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.ERROR)
+    results = run(args.sizes, args.repeat, args.only)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    report(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({str(size): operations for size, operations in results.items()}, file, indent = 2)
+
+
+if __name__ == "__main__":
+    main()